@@ -13,6 +13,8 @@ from sklearn import cluster
 
 logger = logging.getLogger(__name__)
 
+_LOG_2PI = np.log(2 * np.pi)
+
 
 class GaussianMixture(object):
 
@@ -313,7 +315,7 @@ class GaussianMixture(object):
         """
 
         weighted_log_prob = self._estimate_weighted_log_prob(y)
-        log_prob_norm = scipy.misc.logsumexp(weighted_log_prob, axis=1)
+        log_prob_norm = scipy.special.logsumexp(weighted_log_prob, axis=1)
         with np.errstate(under="ignore"):
             # Ignore underflow errors.
             log_resp = weighted_log_prob - log_prob_norm[:, np.newaxis]
@@ -578,7 +580,7 @@ def _estimate_log_gaussian_prob(y, means, precision_cholesky, covariance_type):
             diff = np.dot(y, prec_chol) - np.dot(mu, prec_chol)
             log_prob[:, k] = np.sum(np.square(diff), axis=1)
 
-    return  -0.5 * (D * np.log(2 * np.pi) + log_prob) + log_det
+    return  -0.5 * (D * _LOG_2PI + log_prob) + log_det
     
 
 def _compute_cholesky_decomposition(covariances, covariance_type):
@@ -635,4 +637,4 @@ def log_kappa(D):
     :returns:
         The approximate logarithm of the lattice constant.
     """
-    return np.log(D * np.pi)/D - np.log(2 * np.pi) - 1
\ No newline at end of file
+    return np.log(D * np.pi)/D - _LOG_2PI - 1
\ No newline at end of file
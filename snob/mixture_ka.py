@@ -11,12 +11,16 @@ __all__ = [
     "split_component", "merge_component", "delete_component", 
 ] 
 import logging
+import multiprocessing
+import multiprocessing.pool
 import numpy as np
 import scipy
 from collections import defaultdict
 
 logger = logging.getLogger(__name__)
 
+_LOG_2PI = np.log(2 * np.pi)
+
 
 class GaussianMixture(object):
 
@@ -97,7 +101,7 @@ class GaussianMixture(object):
         return self._max_em_iterations
 
 
-    def _fit_kasarapu_allison(self, y, **kwargs):
+    def _fit_kasarapu_allison(self, y, processes=1, threads=False, **kwargs):
         r"""
         Minimize the message length of a mixture of Gaussians, 
         using the perturbation search algorithm described by
@@ -108,6 +112,20 @@ class GaussianMixture(object):
             where :math:`N` is the number of observations, and :math:`D` is
             the number of dimensions per observation.
 
+        :param processes: [optional]
+            The number of processes to use when evaluating the split, delete,
+            and merge perturbations, which are independent of each other
+            (default: ``1``). If ``None`` is given then the number of CPUs
+            will be used.
+
+        :param threads: [optional]
+            Evaluate the perturbations in a pool of threads instead of a pool
+            of processes (default: ``False``). The threads share the data and
+            the current mixture without copying them, and most of the work in
+            each perturbation is done in LAPACK/BLAS routines that release the
+            global interpreter lock. This has no effect when ``processes`` is
+            ``1``: the perturbations are then evaluated serially.
+
         :returns:
             A tuple containing the optimized parameters ``(mu, cov, weight)``.
         """
@@ -124,54 +142,66 @@ class GaussianMixture(object):
         N, D = y.shape
         iterations = 1
         
-        R, ll, message_length = _expectation(y, mu, cov, weight, **kwds)
+        precision_cholesky = _compute_precision_cholesky(
+            cov, self.covariance_type)
+        R, ll, message_length = _expectation(y, mu, cov, weight, 
+            precision_cholesky=precision_cholesky, **kwds)
         ll_dl = [(ll, message_length)]
 
-        while True:
-
-            M = weight.size
-            best_perturbations = defaultdict(lambda: [np.inf])
-                
-            # Exhaustively split all components.
-            for m in range(M):
-                p = split_component(y, mu, cov, weight, R, m, **kwds)
-
-                # Keep best split component.
-                if p[-1] < best_perturbations["split"][-1]:
-                    best_perturbations["split"] = [m] + list(p)
-            
-            if M > 1:
-                # Exhaustively delete all components.
-                for m in range(M):
-                    p = delete_component(y, mu, cov, weight, R, m, **kwds)
-
-                    # Keep best deleted component.
-                    if p[-1] < best_perturbations["delete"][-1]:
-                        best_perturbations["delete"] = [m] + list(p)
-                
-                # Exhaustively merge all components.
-                for m in range(M):
-                    p = merge_component(y, mu, cov, weight, R, m, **kwds)
-
-                    # Keep best merged component.
-                    if p[-1] < best_perturbations["merge"][-1]:
-                        best_perturbations["merge"] = [m] + list(p)
-
-            # Get best perturbation.
-            bop, bp = min(best_perturbations.items(), key=lambda x: x[1][-1])
-            b_m, b_mu, b_cov, b_weight, b_R, b_meta, b_ml = bp
-
-            logger.debug("Best operation: {} {}".format(bop, b_ml))
-
-            if message_length > b_ml:
-                # Set the new state as the best perturbation.
-                iterations += 1
-                message_length = b_ml
-                mu, cov, weight, R = (b_mu, b_cov, b_weight, b_R)
-
-            else:
-                # None of the perturbations were better than what we had.
-                break
+        # The threads share one pool for the whole search; a pool of processes
+        # is started for each sweep of perturbations.
+        pool = multiprocessing.pool.ThreadPool(processes) \
+            if threads and (processes is None or processes > 1) else None
+
+        try:
+            while True:
+
+                M = weight.size
+                best_perturbations = defaultdict(lambda: [np.inf])
+
+                # Exhaustively split all components, and if there is more than
+                # one component, exhaustively delete and merge them too.
+                operations = ("split", "delete", "merge") if M > 1 else ("split", )
+                tasks = [(op, m) for op in operations for m in range(M)]
+
+                # Perturbations that cannot beat the current mixture can stop
+                # their E-M early. All merges need the Kullback-Leibler
+                # distances between the components of the current mixture:
+                # calculate them together.
+                op_kwds = dict(kwds, dl_upper_bound=message_length)
+                D_kl = None if M < 2 else _kullback_leibler_distances(
+                    mu, cov, precision_cholesky, self.covariance_type)
+
+                state = (y, mu, cov, weight, R, op_kwds, D_kl)
+                perturbations = _evaluate_perturbations(state, tasks, 
+                    processes=processes, pool=pool)
+
+                for (operation, m), p in zip(tasks, perturbations):
+                    # Keep best component for each operation.
+                    if p[-1] < best_perturbations[operation][-1]:
+                        best_perturbations[operation] = [m] + list(p)
+
+                # Get best perturbation.
+                bop, bp = min(best_perturbations.items(), key=lambda x: x[1][-1])
+                b_m, b_mu, b_cov, b_weight, b_R, b_meta, b_ml = bp
+
+                logger.debug("Best operation: {} {}".format(bop, b_ml))
+
+                if message_length > b_ml:
+                    # Set the new state as the best perturbation.
+                    iterations += 1
+                    message_length = b_ml
+                    mu, cov, weight, R = (b_mu, b_cov, b_weight, b_R)
+                    precision_cholesky = b_meta["precision_cholesky"]
+
+                else:
+                    # None of the perturbations were better than what we had.
+                    break
+
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
 
         # TODO: a full_output response.
         meta = dict(message_length=message_length)
@@ -181,8 +211,110 @@ class GaussianMixture(object):
 
 
 
+def _evaluate_perturbations(state, tasks, processes=1, pool=None):
+    r"""
+    Evaluate perturbations (splits, deletes, and merges) of a mixture.
+
+    :param state:
+        A tuple containing the data values, the mean values, the covariance
+        matrices, the relative weights, the responsibility matrix, a dictionary
+        of keyword arguments to pass to the operations, and the pairwise
+        Kullback-Leibler distances between components (or ``None``).
+
+    :param tasks:
+        A list of ``(operation, index)`` tuples that name the operation, and
+        the component to apply it to.
+
+    :param processes: [optional]
+        The number of processes to use, if no ``pool`` is given (default:
+        ``1``). If ``None`` is given then the number of CPUs will be used.
+
+    :param pool: [optional]
+        A pool of threads to evaluate the perturbations, which share the
+        ``state`` without copying it.
+
+    :returns:
+        A list of the results of each perturbation, in the order of ``tasks``.
+    """
+
+    if pool is not None:
+        # Perturbations are handed out one at a time because their cost varies
+        # a lot (e.g., when E-M stops early).
+        return pool.map(lambda task: _apply_perturbation(state, task), tasks,
+            chunksize=1)
+
+    if processes is not None and processes < 2:
+        return [_apply_perturbation(state, task) for task in tasks]
+
+    # The state is given to each worker process once when it starts (and with
+    # the default start method on Linux, it is inherited without copying), so
+    # only the (operation, index) of each perturbation is sent to the workers.
+    # The state changes after every sweep, so the workers only live for one.
+    pool = multiprocessing.Pool(processes,
+        initializer=_initialize_perturbation_worker, initargs=(state, ))
+    try:
+        return pool.map(_perturb, tasks, chunksize=1)
+
+    finally:
+        pool.close()
+        pool.join()
+
+
+
+# The state of the mixture in each worker process used to evaluate perturbations.
+_worker_state = None
+
+def _initialize_perturbation_worker(state):
+    r"""
+    Store the state of the mixture in a worker process, so that it does not
+    have to be sent with every perturbation.
+
+    :param state:
+        The state of the mixture, as given to :func:`_evaluate_perturbations`.
+    """
+    global _worker_state
+    _worker_state = state
+
+
+def _perturb(task):
+    r"""
+    Apply a single perturbation to the mixture stored in this worker process.
+
+    :param task:
+        A tuple containing the name of the operation, and the index of the
+        component to perturb.
+    """
+    return _apply_perturbation(_worker_state, task)
+
+
+def _apply_perturbation(state, task):
+    r"""
+    Apply a single perturbation (split, delete, or merge) to a mixture.
+
+    :param state:
+        The state of the mixture, as given to :func:`_evaluate_perturbations`.
+
+    :param task:
+        A tuple containing the name of the operation, and the index of the
+        component to perturb.
+
+    :returns:
+        The result of the perturbation, as returned by :func:`split_component`,
+        :func:`delete_component`, or :func:`merge_component`.
+    """
+
+    y, mu, cov, weight, responsibility, kwds, distances = state
+    operation, index = task
+    if operation == "merge":
+        kwds = dict(kwds, distances=distances[index])
+
+    function = dict(split=split_component, delete=delete_component,
+                    merge=merge_component)[operation]
+    return function(y, mu, cov, weight, responsibility, index, **kwds)
+
+
 def responsibility_matrix(y, mu, cov, weight, covariance_type, 
-    full_output=False, **kwargs):
+    full_output=False, precision_cholesky=None, y_squared=None, **kwargs):
     r"""
     Return the responsibility matrix,
 
@@ -222,25 +354,38 @@ def responsibility_matrix(y, mu, cov, weight, covariance_type,
         If ``True``, return the responsibility matrix, and the log likelihood,
         which is evaluated for free (default: ``False``).
 
+    :param precision_cholesky: [optional]
+        The Cholesky decomposition of the precision matrices, if they have
+        already been computed from ``cov``.
+
+    :param y_squared: [optional]
+        The element-wise square of ``y``, if it is already known. This is only
+        used for diagonal covariance matrices.
+
     :returns:
         The responsibility matrix. If ``full_output=True``, then the
         log likelihood (per observation) will also be returned.
     """
 
-    precision_cholesky = _compute_precision_cholesky(cov, covariance_type)
-    weighted_log_prob = np.log(weight) + \
-        _estimate_log_gaussian_prob(y, mu, precision_cholesky, covariance_type)
+    if precision_cholesky is None:
+        precision_cholesky = _compute_precision_cholesky(cov, covariance_type)
 
-    log_likelihood = scipy.misc.logsumexp(weighted_log_prob, axis=1)
-    with np.errstate(under="ignore"):
-        log_responsibility = weighted_log_prob - log_likelihood[:, np.newaxis]
+    # The (N, M) array is updated in place from here on, so that no further
+    # temporaries of that size are allocated.
+    weighted_log_prob = _estimate_log_gaussian_prob(
+        y, mu, precision_cholesky, covariance_type, X_squared=y_squared)
+    weighted_log_prob += np.log(weight)
 
-    responsibility = np.exp(log_responsibility).T
+    log_likelihood = scipy.special.logsumexp(weighted_log_prob, axis=1)
+    with np.errstate(under="ignore"):
+        weighted_log_prob -= log_likelihood[:, np.newaxis]
+        responsibility = np.exp(weighted_log_prob, out=weighted_log_prob).T
     
     return (responsibility, log_likelihood) if full_output else responsibility
 
 
-def kullback_leibler_for_multivariate_normals(mu_a, cov_a, mu_b, cov_b):
+def kullback_leibler_for_multivariate_normals(mu_a, cov_a, mu_b, cov_b,
+    cholesky_a=None, cholesky_b=None):
     r"""
     Return the Kullback-Leibler distance from one multivariate normal
     distribution with mean :math:`\mu_a` and covariance :math:`\Sigma_a`,
@@ -275,6 +420,12 @@ def kullback_leibler_for_multivariate_normals(mu_a, cov_a, mu_b, cov_b):
 
     :param cov_b:
         The covariance matrix of the second multivariate normal distribution.
+
+    :param cholesky_a: [optional]
+        The lower Cholesky decomposition of ``cov_a``, if it is already known.
+
+    :param cholesky_b: [optional]
+        The lower Cholesky decomposition of ``cov_b``, if it is already known.
     
     :returns:
         The Kullback-Leibler distance from distribution :math:`a` to :math:`b`
@@ -282,27 +433,40 @@ def kullback_leibler_for_multivariate_normals(mu_a, cov_a, mu_b, cov_b):
         the distance in units of bits.
     """
 
+    k = mu_a.size
+    offset = mu_b - mu_a
+
+    if len(cov_a.shape) == 1 and len(cov_b.shape) == 1:
+        # Diagonal covariance matrices need no factorization at all.
+        return 0.5 * (np.sum(cov_a / cov_b) + np.sum(offset**2 / cov_b) - k \
+                      + np.sum(np.log(cov_b)) - np.sum(np.log(cov_a)))
+
     if len(cov_a.shape) == 1:
         cov_a = cov_a * np.eye(cov_a.size)
 
     if len(cov_b.shape) == 1:
         cov_b = cov_b * np.eye(cov_b.size)
 
-    U, S, V = np.linalg.svd(cov_a)
-    Ca_inv = np.dot(np.dot(V.T, np.linalg.inv(np.diag(S))), U.T)
+    # Both covariance matrices are symmetric positive definite, so a single
+    # Cholesky factorization of each gives us the solves and the determinants.
+    if cholesky_a is None:
+        cholesky_a = np.linalg.cholesky(cov_a)
 
-    U, S, V = np.linalg.svd(cov_b)
-    Cb_inv = np.dot(np.dot(V.T, np.linalg.inv(np.diag(S))), U.T)
+    if cholesky_b is None:
+        cholesky_b = np.linalg.cholesky(cov_b)
 
-    k = mu_a.size
+    log_det_a = 2 * np.sum(np.log(np.diag(cholesky_a)))
+    log_det_b = 2 * np.sum(np.log(np.diag(cholesky_b)))
 
-    offset = mu_b - mu_a
-    return 0.5 * np.sum([
-          np.trace(np.dot(Ca_inv, cov_b)),
-        + np.dot(offset.T, np.dot(Cb_inv, offset)),
-        - k,
-        + np.log(np.linalg.det(cov_b)/np.linalg.det(cov_a))
-    ])
+    z = scipy.linalg.solve_triangular(cholesky_b, offset, lower=True,
+        check_finite=False)
+
+    # Tr(C_b^{-1} C_a) is the squared Frobenius norm of L_b^{-1} L_a, which
+    # needs one triangular solve rather than the two in a Cholesky solve.
+    W = scipy.linalg.solve_triangular(cholesky_b, cholesky_a, lower=True,
+        check_finite=False)
+    trace = np.sum(W**2)
+    return 0.5 * (trace + np.dot(z, z) - k + log_det_b - log_det_a)
 
 
 def _parameters_per_mixture(D, covariance_type):
@@ -366,7 +530,8 @@ def _initialize(y, covariance_type, covariance_regularization, **kwargs):
     return (mean, cov, weight)
     
 
-def _expectation(y, mu, cov, weight, **kwargs):
+def _expectation(y, mu, cov, weight, precision_cholesky=None,
+    message_length=True, **kwargs):
     r"""
     Perform the expectation step of the expectation-maximization algorithm.
 
@@ -389,30 +554,51 @@ def _expectation(y, mu, cov, weight, **kwargs):
         The number of parameters required to specify the mean and covariance
         matrix of a single Gaussian component.
 
+    :param precision_cholesky: [optional]
+        The Cholesky decomposition of the precision matrices, if they have
+        already been computed from ``cov``.
+
+    :param message_length: [optional]
+        Calculate the message length of the mixture (default: ``True``). If
+        ``False``, then ``None`` is returned in its place.
+
     :returns:
         A three-length tuple containing the responsibility matrix,
         the log likelihood, and the change in message length.
     """
 
+    # Factorize the covariance matrices once, and use the same factors for the
+    # responsibilities and the determinants in the message length.
+    if precision_cholesky is None:
+        precision_cholesky = _compute_precision_cholesky(
+            cov, kwargs["covariance_type"])
+    log_det_cov = -2 * _compute_log_det_cholesky(
+        precision_cholesky, kwargs["covariance_type"], y.shape[1])
+
     responsibility, log_likelihood = responsibility_matrix(
-        y, mu, cov, weight, full_output=True, **kwargs)
+        y, mu, cov, weight, full_output=True,
+        precision_cholesky=precision_cholesky, **kwargs)
 
     nll = -np.sum(log_likelihood)
 
-    I = _message_length(y, mu, cov, weight, responsibility, nll, **kwargs)
+    if not message_length:
+        return (responsibility, nll, None)
+
+    I = _message_length(y, mu, cov, weight, responsibility, nll,
+        log_det_cov=log_det_cov, **kwargs)
     
     return (responsibility, nll, I)
 
 
 def log_kappa(D):
 
-    cd = -0.5 * D * np.log(2 * np.pi) + 0.5 * np.log(D * np.pi)
+    cd = -0.5 * D * _LOG_2PI + 0.5 * np.log(D * np.pi)
     return -1 + 2 * cd/D
 
 
 
 def _message_length(y, mu, cov, weight, responsibility, nll,
-    covariance_type, eps=0.10, dofail=False, **kwargs):
+    covariance_type, eps=0.10, dofail=False, log_det_cov=None, **kwargs):
 
     # THIS IS SO BAD
 
@@ -457,22 +643,23 @@ def _message_length(y, mu, cov, weight, responsibility, nll,
     log_F_m += -np.sum(log_det_cov)
     log_F_m += -(D * np.log(2) + (D + 1) * np.sum(log_det_cov))    
     """
-    if D == 1:
-        log_F_m = np.log(2) + (2 * np.log(N)) - 4 * np.log(cov.flatten()[0]**0.5)
-        raise UnsureError
+    if log_det_cov is None:
+        if D == 1:
+            # The determinant of a 1x1 matrix is just its only entry.
+            log_det_cov = np.log(cov.reshape(M))
 
-    else:
-        if covariance_type == "diag":
-            cov_ = np.array([_ * np.eye(D) for _ in cov])
         else:
-            # full
-            cov_ = cov
+            if covariance_type == "diag":
+                log_det_cov = np.sum(np.log(cov), axis=1)
+            else:
+                # full
+                log_det_cov = -2 * _compute_log_det_cholesky(
+                    _compute_precision_cholesky(cov, covariance_type),
+                    covariance_type, D)
 
-        log_det_cov = np.log(np.linalg.det(cov_))
-    
-        log_F_m = 0.5 * D * (D + 3) * np.log(np.sum(responsibility, axis=1)) 
-        log_F_m += -log_det_cov
-        log_F_m += -(D * np.log(2) + (D + 1) * log_det_cov)
+    log_F_m = 0.5 * D * (D + 3) * np.log(np.sum(responsibility, axis=1)) 
+    log_F_m += -log_det_cov
+    log_F_m += -(D * np.log(2) + (D + 1) * log_det_cov)
 
         
     # TODO: No prior on h(theta).. thus -\sum_{j=1}^{M}\log{h\left(\theta_j\right)} = 0
@@ -480,9 +667,6 @@ def _message_length(y, mu, cov, weight, responsibility, nll,
     # TODO: bother about including this? -N * D * np.log(eps)
     
 
-    N_cp = _parameters_per_mixture(D, covariance_type)
-    part2 = nll + N_cp/(2*np.log(2))
-
     AOM = 0.001 # MAGIC
     Il = nll - (D * N * np.log(AOM))
     Il = Il/np.log(2) # [bits]
@@ -534,6 +718,64 @@ def _message_length(y, mu, cov, weight, responsibility, nll,
     return I
 
 
+def _kullback_leibler_distances(mu, cov, precision_cholesky, covariance_type):
+    r"""
+    Return the Kullback-Leibler distances between all pairs of components in
+    a mixture of multivariate normal distributions.
+
+    :param mu:
+        The mean values of the :math:`M` multivariate normal distributions.
+
+    :param cov:
+        The covariance matrices of the :math:`M` multivariate normal
+        distributions.
+
+    :param precision_cholesky:
+        The Cholesky decomposition of the precision matrices of all :math:`M`
+        components, as given by :func:`_compute_precision_cholesky`.
+
+    :param covariance_type:
+        The structure of the covariance matrix for individual components.
+        The available options are: `full` for a free covariance matrix, or
+        `diag` for a diagonal covariance matrix.
+
+    :returns:
+        A :math:`M\times{}M` array where the :math:`(a, b)`-th entry is the
+        Kullback-Leibler distance from component :math:`a` to component
+        :math:`b`, in units of nats (see 
+        :func:`kullback_leibler_for_multivariate_normals`). The diagonal
+        entries are set to infinity.
+    """
+
+    M, D = mu.shape
+    offset = mu[np.newaxis, :, :] - mu[:, np.newaxis, :]
+    log_det = -2 * _compute_log_det_cholesky(
+        precision_cholesky, covariance_type, D)
+
+    if covariance_type == "full":
+        # Tr(C_b^{-1}C_a) is the sum of the elementwise product of the two.
+        precision = np.matmul(precision_cholesky, 
+            np.transpose(precision_cholesky, (0, 2, 1)))
+        trace = np.einsum("bij,aij->ab", precision, cov)
+
+        # (mu_b - mu_a)^T C_b^{-1} (mu_b - mu_a) = |P_b^T(mu_b - mu_a)|^2
+        z = np.einsum("bji,abj->abi", precision_cholesky, offset)
+        mahalanobis = np.einsum("abi,abi->ab", z, z)
+
+    elif covariance_type == "diag":
+        precision = precision_cholesky**2
+        trace = np.dot(cov, precision.T)
+        mahalanobis = np.einsum("abi,bi->ab", offset**2, precision)
+
+    else:
+        raise ValueError("unknown covariance type")
+
+    D_kl = 0.5 * (trace + mahalanobis - D \
+                  + log_det[np.newaxis, :] - log_det[:, np.newaxis])
+    D_kl[np.diag_indices(M)] = np.inf
+    return D_kl
+
+
 def _compute_precision_cholesky(covariances, covariance_type):
     r"""
     Compute the Cholesky decomposition of the precision of the covariance
@@ -553,16 +795,20 @@ def _compute_precision_cholesky(covariances, covariance_type):
     if covariance_type in "full":
         M, D, _ = covariances.shape
 
+        # For the small matrices found here, calling LAPACK directly is much
+        # cheaper than going through the checks in the high-level wrappers.
         cholesky_precision = np.empty((M, D, D))
         for m, covariance in enumerate(covariances):
-            try:
-                cholesky_cov = scipy.linalg.cholesky(covariance, lower=True) 
-            except scipy.linalg.LinAlgError:
+            cholesky_cov, info = scipy.linalg.lapack.dpotrf(
+                covariance, lower=True, clean=True)
+            if info != 0:
                 raise ValueError(singular_matrix_error)
 
+            inverse, info = scipy.linalg.lapack.dtrtri(cholesky_cov, lower=True)
+            if info != 0:
+                raise ValueError(singular_matrix_error)
 
-            cholesky_precision[m] = scipy.linalg.solve_triangular(
-                cholesky_cov, np.eye(D), lower=True).T
+            cholesky_precision[m] = inverse.T
 
     elif covariance_type in "diag":
         if np.any(np.less_equal(covariances, 0.0)):
@@ -578,28 +824,33 @@ def _compute_precision_cholesky(covariances, covariance_type):
 
 
 def _estimate_covariance_matrix_full(y, responsibility, mean, 
-    covariance_regularization=0):
+    covariance_regularization=0, membership=None):
 
     N, D = y.shape
     M, N = responsibility.shape
 
-    membership = np.sum(responsibility, axis=1)
+    if D == 1:
+        return _estimate_covariance_matrix_diag(y, responsibility, mean,
+            covariance_regularization, membership).reshape((M, 1, 1))
 
-    I = np.eye(D)
-    cov = np.empty((M, D, D))
-    for m, (mu, rm, nm) in enumerate(zip(mean, responsibility, membership)):
+    if membership is None:
+        membership = np.sum(responsibility, axis=1)
+    denominator = np.where(membership > 1, membership - 1, membership)
 
+    cov = np.empty((M, D, D))
+    for m, (mu, rm) in enumerate(zip(mean, responsibility)):
         diff = y - mu
-        denominator = nm - 1 if nm > 1 else nm
+        cov[m] = np.dot(rm * diff.T, diff)
 
-        cov[m] = np.dot(rm * diff.T, diff) / denominator \
-               + covariance_regularization * I
+    cov /= denominator[:, np.newaxis, np.newaxis]
+    # Add the regularization to a strided view of the diagonals.
+    cov.reshape((M, -1))[:, ::D + 1] += covariance_regularization
 
     return cov
 
 
 def _estimate_covariance_matrix(y, responsibility, mean, covariance_type,
-    covariance_regularization):
+    covariance_regularization, membership=None):
 
     available = {
         "full": _estimate_covariance_matrix_full,
@@ -612,32 +863,28 @@ def _estimate_covariance_matrix(y, responsibility, mean, covariance_type,
     except KeyError:
         raise ValueError("unknown covariance type")
 
-    return function(y, responsibility, mean, covariance_regularization)
+    return function(y, responsibility, mean, covariance_regularization,
+        membership=membership)
 
 def _estimate_covariance_matrix_diag(y, responsibility, mean, 
-    covariance_regularization=0):
+    covariance_regularization=0, membership=None):
 
     N, D = y.shape
     M, N = responsibility.shape
 
-    denominator = np.sum(responsibility, axis=1)
-    denominator[denominator > 1] = denominator[denominator > 1] - 1
-
-    membership = np.sum(responsibility, axis=1)
+    if membership is None:
+        membership = np.sum(responsibility, axis=1)
+    denominator = np.where(membership > 1, membership - 1, membership)
 
-    I = np.eye(D)
     cov = np.empty((M, D))
-    for m, (mu, rm, nm) in enumerate(zip(mean, responsibility, membership)):
-
-        diff = y - mu
-        denominator = nm - 1 if nm > 1 else nm
+    for m, (mu, rm) in enumerate(zip(mean, responsibility)):
+        cov[m] = np.dot(rm, (y - mu)**2)
 
-        cov[m] = np.dot(rm, diff**2) / denominator + covariance_regularization
+    cov /= denominator[:, np.newaxis]
+    cov += covariance_regularization
 
     return cov
 
-    
-
 
 def _compute_log_det_cholesky(matrix_chol, covariance_type, n_features):
     """Compute the log-det of the cholesky decomposition of matrices.
@@ -675,24 +922,37 @@ def _compute_log_det_cholesky(matrix_chol, covariance_type, n_features):
     return log_det_chol
 
 
-def _estimate_log_gaussian_prob(X, means, precision_cholesky, covariance_type):
+def _estimate_log_gaussian_prob(X, means, precision_cholesky, covariance_type,
+    X_squared=None):
     n_samples, n_features = X.shape
     n_components, _ = means.shape
+    if covariance_type == "full" and n_features == 1:
+        # A 1x1 covariance matrix is also diagonal, and the diagonal branch
+        # needs no stacked matrix products.
+        precision_cholesky = precision_cholesky.reshape(n_components, 1)
+        covariance_type = "diag"
+
     # det(precision_chol) is half of det(precision)
     log_det = _compute_log_det_cholesky(
         precision_cholesky, covariance_type, n_features)
 
     if covariance_type in 'full':
-        log_prob = np.empty((n_samples, n_components))
-        for k, (mu, prec_chol) in enumerate(zip(means, precision_cholesky)):
-            y = np.dot(X, prec_chol) - np.dot(mu, prec_chol)
-            log_prob[:, k] = np.sum(np.square(y), axis=1)
+        # Whiten the data for all components at once: (n_components, n_samples,
+        # n_features) from a single stacked matrix product.
+        y = np.matmul(X, precision_cholesky)
+        y -= np.matmul(means[:, np.newaxis, :], precision_cholesky)
+        log_prob = np.einsum("mnd,mnd->nm", y, y)
 
     elif covariance_type in 'diag':
+        if X_squared is None:
+            X_squared = X**2
         precisions = precision_cholesky**2
-        log_prob = (np.sum((means ** 2 * precisions), 1) - 2.0 * np.dot(X, (means * precisions).T) + np.dot(X**2, precisions.T))
+        log_prob = (np.sum((means ** 2 * precisions), 1) - 2.0 * np.dot(X, (means * precisions).T) + np.dot(X_squared, precisions.T))
 
-    return -0.5 * (n_features * np.log(2 * np.pi) + log_prob) + log_det
+    log_prob += n_features * _LOG_2PI
+    log_prob *= -0.5
+    log_prob += log_det
+    return log_prob
 
 
 def _maximization(y, mu, cov, weight, responsibility, parent_responsibility=1,
@@ -730,22 +990,27 @@ def _maximization(y, mu, cov, weight, responsibility, parent_responsibility=1,
 
     M = weight.size 
     N, D = y.shape
-    
+
     # Update the weights.
     effective_membership = np.sum(responsibility, axis=1)
     new_weight = (effective_membership + 0.5)/(N + M/2.0)
 
-    w_responsibility = parent_responsibility * responsibility
-    w_effective_membership = np.sum(w_responsibility, axis=1)
+    if np.isscalar(parent_responsibility) and parent_responsibility == 1:
+        w_responsibility = responsibility
+        w_effective_membership = effective_membership
+
+    else:
+        w_responsibility = parent_responsibility * responsibility
+        w_effective_membership = np.sum(w_responsibility, axis=1)
 
-    new_mu = np.zeros_like(mu)
-    new_cov = np.zeros_like(cov)
-    for m in range(M):
-        new_mu[m] = np.sum(w_responsibility[m] * y.T, axis=1) \
-                  / w_effective_membership[m]
+    new_mu = np.dot(w_responsibility, y) / w_effective_membership[:, np.newaxis]
 
+    # The covariances are estimated from the data about the new means. Taking
+    # them from uncentred moments instead loses precision when the means are
+    # large compared to the spread of the data.
     new_cov = _estimate_covariance_matrix(y, responsibility, new_mu,
-        kwargs["covariance_type"], kwargs["covariance_regularization"])
+        kwargs["covariance_type"], kwargs["covariance_regularization"],
+        membership=effective_membership)
 
     state = (new_mu, new_cov, new_weight)
 
@@ -758,7 +1023,8 @@ def _maximization(y, mu, cov, weight, responsibility, parent_responsibility=1,
 
 
 
-def _expectation_maximization(y, mu, cov, weight, responsibility=None, **kwargs):
+def _expectation_maximization(y, mu, cov, weight, responsibility=None, 
+    dl_upper_bound=None, **kwargs):
     r"""
     Run the expectation-maximization algorithm on the current set of
     multivariate Gaussian mixtures.
@@ -790,6 +1056,12 @@ def _expectation_maximization(y, mu, cov, weight, responsibility=None, **kwargs)
         matrix for all components, `tied_diag` for a common diagonal
         covariance matrix for all components (default: ``free``).
 
+    :param dl_upper_bound: [optional]
+        The message length of the best mixture found so far. If given, E-M
+        will stop once the message length of this mixture is greater than
+        this value and is no longer decreasing, since this mixture will not be
+        accepted anyway.
+
     :param threshold: [optional]
         The relative improvement in log likelihood required before stopping
         an expectation-maximization step (default: ``1e-5``).
@@ -805,17 +1077,32 @@ def _expectation_maximization(y, mu, cov, weight, responsibility=None, **kwargs)
         in message length.
     """   
 
-    M = weight.size
-    N, D = y.shape
-    
-    # Calculate log-likelihood and initial expectation step.
-    _init_responsibility, ll, dl = _expectation(y, mu, cov, weight, **kwargs)
+    # Calculate log-likelihood and initial expectation step. If we were given
+    # a responsibility matrix then the one calculated here is not needed.
+    # The factors of the precision matrices are kept with the state, so that
+    # whoever uses this mixture next does not have to factorize it again.
+    # Convergence is judged on the log-likelihood, so the message length is
+    # only needed at every step if we are checking it against a bound. That is
+    # the case for every perturbation evaluated by GaussianMixture.fit, so
+    # only callers that give no bound skip it.
+    track_message_length = dl_upper_bound is not None
+    precision_cholesky = _compute_precision_cholesky(
+        cov, kwargs["covariance_type"])
+
+    # The E-step needs y**2 for diagonal covariance matrices, and it does not
+    # change between iterations.
+    y_squared = y**2 if kwargs["covariance_type"] == "diag" else None
+
+    _init_responsibility, ll, dl = _expectation(y, mu, cov, weight, 
+        precision_cholesky=precision_cholesky, y_squared=y_squared,
+        message_length=track_message_length, **kwargs)
 
     if responsibility is None:
         responsibility = _init_responsibility
+    del _init_responsibility
 
     iterations = 1
-    ll_dl = [(ll, dl)]
+    bounded = False
 
     while True:
 
@@ -823,14 +1110,15 @@ def _expectation_maximization(y, mu, cov, weight, responsibility=None, **kwargs)
         mu, cov, weight \
             = _maximization(y, mu, cov, weight, responsibility, **kwargs)
 
-        # Run the expectation step.
-        responsibility, ll, dl \
-            = _expectation(y, mu, cov, weight, **kwargs)
+        # Run the expectation step, and check for convergence.
+        prev_ll, prev_dl = (ll, dl)
+        precision_cholesky = _compute_precision_cholesky(
+            cov, kwargs["covariance_type"])
+        responsibility, ll, dl = _expectation(y, mu, cov, weight, 
+            precision_cholesky=precision_cholesky, y_squared=y_squared,
+            message_length=track_message_length, **kwargs)
 
-        # Check for convergence.
-        prev_ll, prev_dl = ll_dl[-1]
         relative_delta_message_length = np.abs((ll - prev_ll)/prev_ll)
-        ll_dl.append([ll, dl])
         iterations += 1
 
         assert np.isfinite(relative_delta_message_length)
@@ -839,7 +1127,21 @@ def _expectation_maximization(y, mu, cov, weight, responsibility=None, **kwargs)
         or iterations >= kwargs["max_em_iterations"]:
             break
 
-    meta = dict(warnflag=iterations >= kwargs["max_em_iterations"], log_likelihood=ll)
+        # Stop if this mixture is worse than the best one we know of, and E-M
+        # has stopped improving it.
+        if track_message_length and dl > dl_upper_bound and dl >= prev_dl:
+            bounded = True
+            break
+
+    if dl is None:
+        log_det_cov = -2 * _compute_log_det_cholesky(
+            precision_cholesky, kwargs["covariance_type"], y.shape[1])
+        dl = _message_length(y, mu, cov, weight, responsibility, ll,
+            log_det_cov=log_det_cov, **kwargs)
+
+    meta = dict(warnflag=iterations >= kwargs["max_em_iterations"], 
+        log_likelihood=ll, bounded=bounded, 
+        precision_cholesky=precision_cholesky)
     if meta["warnflag"]:
         logger.warn("Maximum number of E-M iterations reached ({}) {}".format(
             kwargs["max_em_iterations"], kwargs.get("_warn_context", "")))
@@ -847,13 +1149,35 @@ def _expectation_maximization(y, mu, cov, weight, responsibility=None, **kwargs)
     return (mu, cov, weight, responsibility, meta, dl)
 
 
-def _svd(covariance, covariance_type):
+def _principal_axis(covariance, covariance_type):
+    r"""
+    Return the largest eigenvalue of a covariance matrix, and the corresponding
+    eigenvector (the direction of maximum variance).
+
+    :param covariance:
+        The covariance matrix of a single component.
+
+    :param covariance_type:
+        The structure of the covariance matrix for individual components.
+        The available options are: `full` for a free covariance matrix, or
+        `diag` for a diagonal covariance matrix.
+
+    :returns:
+        A two-length tuple containing the largest eigenvalue and the unit
+        eigenvector.
+    """
 
     if covariance_type == "full":
-        return np.linalg.svd(covariance)
+        # The covariance matrix is symmetric, so eigh gives the eigenvalues
+        # in ascending order, and no SVD is needed.
+        S, V = np.linalg.eigh(covariance)
+        return (S[-1], V[:, -1])
 
     elif covariance_type == "diag":
-        return np.linalg.svd(covariance * np.eye(covariance.size))
+        index = np.argmax(covariance)
+        V = np.zeros(covariance.size)
+        V[index] = 1
+        return (covariance[index], V)
 
     else:
         raise ValueError("unknown covariance type")
@@ -909,25 +1233,29 @@ def split_component(y, mu, cov, weight, responsibility, index, **kwargs):
     
     # Compute the direction of maximum variance of the parent component, and
     # locate two points which are one standard deviation away on either side.
-    U, S, V = _svd(cov[index], kwargs["covariance_type"])
+    S, V = _principal_axis(cov[index], kwargs["covariance_type"])
 
-    child_mu = mu[index] - np.vstack([+V[0], -V[0]]) * S[0]**0.5
+    child_mu = mu[index] - np.vstack([+V, -V]) * S**0.5
 
     assert np.all(np.isfinite(child_mu))
 
     # Responsibilities are initialized by allocating the data points to the 
-    # closest of the two means.
-    distance = np.vstack([
-        np.sum((y - child_mu[0])**2, axis=1),
-        np.sum((y - child_mu[1])**2, axis=1)
-    ])
+    # closest of the two means. Since |y - mu|^2 = |y|^2 - 2y.mu + |mu|^2 and
+    # the |y|^2 term is common to both means, it is not needed for the argmin.
+    distance = np.sum(child_mu**2, axis=1) - 2 * np.dot(y, child_mu.T)
+    assignment = np.argmin(distance, axis=1)
     
     child_responsibility = np.zeros((2, N))
-    child_responsibility[np.argmin(distance, axis=0), np.arange(N)] = 1.0
+    child_responsibility[assignment, np.arange(N)] = 1.0
 
-    # Calculate the child covariance matrices.
-    child_cov = _estimate_covariance_matrix(y, child_responsibility, child_mu,
-        kwargs["covariance_type"], kwargs["covariance_regularization"])
+    # Calculate the child covariance matrices. Since the responsibilities are
+    # either zero or one, only the data assigned to each child contribute.
+    child_cov = np.empty((2, ) + cov.shape[1:])
+    for k in range(2):
+        y_k = y[assignment == k]
+        child_cov[k] = _estimate_covariance_matrix(y_k, 
+            np.ones((1, y_k.shape[0])), child_mu[[k]], 
+            kwargs["covariance_type"], kwargs["covariance_regularization"])[0]
 
     child_effective_membership = np.sum(child_responsibility, axis=1)    
     child_weight = child_effective_membership.T/child_effective_membership.sum()
@@ -959,19 +1287,30 @@ def split_component(y, mu, cov, weight, responsibility, index, **kwargs):
 
     if M > 1:
 
-        # Integrate the M + 1 components and run expectation-maximization
-        weight = np.hstack([weight, [parent_weight * child_weight[1]]])
-        weight[index] = parent_weight * child_weight[0]
+        # Integrate the M + 1 components and run expectation-maximization.
+        # Each array is allocated once at its final size, and the children
+        # are written straight into their rows.
+        new_weight = np.empty(M + 1)
+        new_weight[:M] = weight
+        new_weight[[index, M]] = parent_weight * child_weight
 
-        responsibility = np.vstack([responsibility, 
-            [parent_responsibility * child_responsibility[1]]])
-        responsibility[index] = parent_responsibility * child_responsibility[0]
-        
-        mu = np.vstack([mu, [child_mu[1]]])
-        mu[index] = child_mu[0]
+        new_responsibility = np.empty((M + 1, N))
+        new_responsibility[:M] = responsibility
+        np.multiply(parent_responsibility, child_responsibility[0],
+            out=new_responsibility[index])
+        np.multiply(parent_responsibility, child_responsibility[1],
+            out=new_responsibility[M])
+
+        new_mu = np.empty((M + 1, D))
+        new_mu[:M] = mu
+        new_mu[[index, M]] = child_mu
 
-        cov = np.vstack([cov, [child_cov[1]]])
-        cov[index] = child_cov[0]
+        new_cov = np.empty((M + 1, ) + cov.shape[1:])
+        new_cov[:M] = cov
+        new_cov[[index, M]] = child_cov
+
+        mu, cov, weight, responsibility \
+            = (new_mu, new_cov, new_weight, new_responsibility)
 
         mu, cov, weight, responsibility, meta, ml = _expectation_maximization(
             y, mu, cov, weight, responsibility, **kwargs)
@@ -1035,30 +1374,33 @@ def delete_component(y, mu, cov, weight, responsibility, index, **kwargs):
     # Create new component weights.
     parent_weight = weight[index]
     parent_responsibility = responsibility[index]
+
+    # Index the remaining components once with a mask, rather than having
+    # np.delete build an index array for every parameter.
+    keep = np.ones(weight.size, dtype=bool)
+    keep[index] = False
     
     # Eq. 54-55
-    new_weight = np.clip(
-        np.delete(weight, index, axis=0)/(1-parent_weight),
-        0, 1)
+    new_weight = np.clip(weight[keep]/(1-parent_weight), 0, 1)
     
     # Calculate the new responsibility safely.
     new_responsibility = np.clip(
-        np.delete(responsibility, index, axis=0) / (1 - parent_responsibility),
-        0, 1)
+        responsibility[keep] / (1 - parent_responsibility), 0, 1)
     new_responsibility[~np.isfinite(new_responsibility)] = 0.0
 
     assert np.all(np.isfinite(new_responsibility))
     assert np.all(np.isfinite(new_weight))
 
-    new_mu = np.delete(mu, index, axis=0)
-    new_cov = np.delete(cov, index, axis=0)
+    new_mu = mu[keep]
+    new_cov = cov[keep]
 
     # Run expectation-maximizaton on the perturbed mixtures. 
     return _expectation_maximization(y, new_mu, new_cov, new_weight, 
         new_responsibility, **kwargs)
 
 
-def merge_component(y, mu, cov, weight, responsibility, index, **kwargs):
+def merge_component(y, mu, cov, weight, responsibility, index, distances=None,
+    **kwargs):
     r"""
     Merge a component from the mixture with its "closest" component, as
     judged by the Kullback-Leibler distance.
@@ -1084,6 +1426,11 @@ def merge_component(y, mu, cov, weight, responsibility, index, **kwargs):
     :param index:
         The index of the component to be deleted.
 
+    :param distances: [optional]
+        The Kullback-Leibler distances from the ``index``-th component to all
+        components, if they are already known (e.g., a row from
+        :func:`_kullback_leibler_distances`).
+
     :param covariance_type: [optional]
         The structure of the covariance matrix for individual components.
         The available options are: `free` for a free covariance matrix,
@@ -1099,11 +1446,14 @@ def merge_component(y, mu, cov, weight, responsibility, index, **kwargs):
     """
 
     # Calculate the Kullback-Leibler distance to the other distributions.
-    D_kl = np.inf * np.ones(weight.size)
-    for m in range(weight.size):
-        if m == index: continue
-        D_kl[m] = kullback_leibler_for_multivariate_normals(
-            mu[index], cov[index], mu[m], cov[m])
+    if distances is None:
+        covariance_type = kwargs["covariance_type"]
+        precision_cholesky = _compute_precision_cholesky(cov, covariance_type)
+        D_kl = _kullback_leibler_distances(
+            mu, cov, precision_cholesky, covariance_type)[index]
+
+    else:
+        D_kl = distances
 
     a_index, b_index = (index, np.nanargmin(D_kl))
 
@@ -1116,7 +1466,7 @@ def merge_component(y, mu, cov, weight, responsibility, index, **kwargs):
     responsibility_k = np.sum(responsibility[[a_index, b_index]], axis=0)
     effective_membership_k = np.sum(responsibility_k)
 
-    mu_k = np.sum(responsibility_k * y.T, axis=1) / effective_membership_k
+    mu_k = np.dot(responsibility_k, y) / effective_membership_k
     cov_k = _estimate_covariance_matrix(
         y, np.atleast_2d(responsibility_k), np.atleast_2d(mu_k), 
         kwargs["covariance_type"], kwargs["covariance_regularization"])
@@ -1125,10 +1475,13 @@ def merge_component(y, mu, cov, weight, responsibility, index, **kwargs):
     del_index = np.max([a_index, b_index])
     keep_index = np.min([a_index, b_index])
 
-    new_mu = np.delete(mu, del_index, axis=0)
-    new_cov = np.delete(cov, del_index, axis=0)
-    new_weight = np.delete(weight, del_index, axis=0)
-    new_responsibility = np.delete(responsibility, del_index, axis=0)
+    keep = np.ones(weight.size, dtype=bool)
+    keep[del_index] = False
+
+    new_mu = mu[keep]
+    new_cov = cov[keep]
+    new_weight = weight[keep]
+    new_responsibility = responsibility[keep]
 
     new_mu[keep_index] = mu_k
     new_cov[keep_index] = cov_k
@@ -18,15 +18,31 @@ from collections import defaultdict
 
 logger = logging.getLogger(__name__)
 
+_LOG_2PI = np.log(2 * np.pi)
 
-# OK,. let's see if we can estimate the learning rate \gamma
-def _evaluate_gaussian(y, mu, cov):
-   N, D = y.shape
-   Cinv = np.linalg.inv(cov)
-   scale = 1.0/np.sqrt((2*np.pi)**D * np.linalg.det(cov))#
-   #Cinv**(-0.5)
-   d = y - mu
-   return scale * np.exp(-0.5 * np.sum(d.T * np.dot(Cinv, d.T), axis=0))
+
+def _evaluate_gaussians(y, mu, cov):
+    r"""
+    Evaluate the probability density of the data under all :math:`K` 
+    (full covariance) multivariate Gaussian components at once, using the 
+    Cholesky decomposition of their precision matrices.
+
+    :param y:
+        The data values, :math:`y`.
+
+    :param mu:
+        The mean values of the :math:`K` multivariate normal distributions.
+
+    :param cov:
+        The covariance matrices of the :math:`K` multivariate normal 
+        distributions.
+
+    :returns:
+        A :math:`N\times{}K` array of the probability densities.
+    """
+
+    precision_cholesky = _compute_precision_cholesky(cov, "full")
+    return np.exp(_estimate_log_gaussian_prob(y, mu, precision_cholesky, "full"))
 
 
 def _total_parameters(K, D):
@@ -51,6 +67,79 @@ def _total_parameters(K, D):
     return (0.5 * D * (D + 3) * K) + (K - 1)
 
 
+# Models for the (normalized) improvement in log likelihood with each additional
+# mixture, and their Jacobians, keyed by the number of model parameters.
+_improvement_models = {
+    1: lambda x, *p: p[0] / np.exp(x),
+    2: lambda x, *p: p[0] / np.exp(p[1] * x),
+    3: lambda x, *p: p[0] / np.exp(p[1] * x) + p[2]
+}
+
+_improvement_jacobians = {
+    1: lambda x, *p: np.exp(-x)[:, np.newaxis],
+    2: lambda x, *p: np.vstack([
+        np.exp(-p[1] * x), -p[0] * x * np.exp(-p[1] * x)]).T,
+    3: lambda x, *p: np.vstack([
+        np.exp(-p[1] * x), -p[0] * x * np.exp(-p[1] * x), np.ones(x.size)]).T
+}
+
+
+def _improvement_jacobian(d):
+    r"""
+    Return the Jacobian of the model for the improvement in log likelihood
+    with :math:`d` parameters. The model for more than three parameters is
+    the three parameter model, so the columns for any further parameters
+    are zero.
+
+    :param d:
+        The number of model parameters.
+    """
+
+    if d <= 3:
+        return _improvement_jacobians[d]
+
+    return lambda x, *p: np.hstack([
+        _improvement_jacobians[3](x, *p), np.zeros((x.size, d - 3))])
+
+
+def _fit_improvement_model(x, y, d):
+    r"""
+    Fit the model for the improvement in log likelihood with :math:`d`
+    parameters to the data.
+
+    The one parameter model is linear in its parameter, so the least-squares
+    solution is found directly. For the two parameter model, a straight line
+    fit to :math:`\log{y}` is used as the initial guess for the non-linear
+    least-squares problem, when :math:`y` is positive.
+
+    :param x:
+        The number of mixtures.
+
+    :param y:
+        The (normalized) improvement in log likelihood.
+
+    :param d:
+        The number of model parameters.
+
+    :returns:
+        The optimized model parameters.
+    """
+
+    if d == 1:
+        basis = np.exp(-x)
+        return np.array([np.dot(basis, y) / np.dot(basis, basis)])
+
+    p0 = np.ones(d)
+    if d == 2 and x.size > 1 and np.all(y > 0):
+        slope, intercept = np.polyfit(x, np.log(y), 1)
+        p0 = np.array([np.exp(intercept), -slope])
+
+    cost_function = _improvement_models.get(d, _improvement_models[3])
+    p_opt, p_cov = op.curve_fit(cost_function, x, y, p0=p0,
+        jac=_improvement_jacobian(d), check_finite=False)
+    return p_opt
+
+
 def _generator_for_approximate_log_likelihood_improvement(K, log_likelihood,
     normalization_factor, *log_likelihoods_of_sequentially_increasing_mixtures):
     
@@ -58,11 +147,6 @@ def _generator_for_approximate_log_likelihood_improvement(K, log_likelihood,
     ll = np.hstack([log_likelihood, *log_likelihoods_of_sequentially_increasing_mixtures])
     y = np.diff(ll) / normalization_factor
 
-    functions = {
-        1: lambda x, *p: p[0] / np.exp(x),
-        2: lambda x, *p: p[0] / np.exp(p[1] * x),
-        3: lambda x, *p: p[0] / np.exp(p[1] * x) + p[2]
-    }
 
     foo = False
     if x.size > 3:
@@ -73,11 +157,8 @@ def _generator_for_approximate_log_likelihood_improvement(K, log_likelihood,
     p_opt_ = []
     for d in np.arange(1, 1 + x.size)[::-1]:
 
-        cost_function = functions.get(d, functions[3])
-        p0 = np.ones(d)
-
         try:
-            p_opt, p_cov = op.curve_fit(cost_function, x, y, p0=p0)
+            p_opt = _fit_improvement_model(x, y, d)
         except:
             assert d > 1
             continue
@@ -87,10 +168,16 @@ def _generator_for_approximate_log_likelihood_improvement(K, log_likelihood,
 
     p_opt = p_opt_.pop(0)
     d = p_opt.size
-    cost_function = functions.get(d, functions[3])
+    cost_function = _improvement_models.get(d, _improvement_models[3])
 
-    generating_function = lambda target_K: log_likelihood \
-        + cost_function(np.arange(1, target_K), *p_opt).sum() * normalization_factor
+    def generating_function(target_K):
+        # Accumulate the improvements once, so that many targets can be 
+        # evaluated together.
+        target_K = np.asarray(target_K, dtype=int)
+        improvements = np.hstack([0, np.cumsum(
+            cost_function(np.arange(1, np.max(target_K)), *p_opt))])
+        return log_likelihood \
+            + improvements[target_K - 1] * normalization_factor
 
     if False and foo and x.size > 10:
         import matplotlib.pyplot as plt
@@ -112,23 +199,15 @@ def _approximate_log_likelihood_improvement(y, mu, cov, weight,
 
     # Evaluate the current mixture.
     K = weight.size
-    evaluate_f1 = np.sum(weight * np.vstack(
-        [_evaluate_gaussian(y, mu[k], cov[k]) for k in range(K)]).T)
+    evaluate_f1 = np.sum(weight * _evaluate_gaussians(y, mu, cov))
 
     x = np.arange(K, K + len(log_likelihoods_of_sequentially_increasing_mixtures))
     ll = np.hstack([log_likelihood, log_likelihoods_of_sequentially_increasing_mixtures])
     y = np.diff(ll) / evaluate_f1
 
     d = x.size
-    functions = {
-        1: lambda x, *p: p[0] / np.exp(x),
-        2: lambda x, *p: p[0] / np.exp(p[1] * x),
-        3: lambda x, *p: p[0] / np.exp(p[1] * x) + p[2]
-    }
-    cost_function = functions.get(d, functions[3])
-    p0 = np.ones(d)
-
-    p_opt, p_cov = op.curve_fit(cost_function, x, y, p0=p0)
+    cost_function = _improvement_models.get(d, _improvement_models[3])
+    p_opt = _fit_improvement_model(x, y, d)
     
     # Now generate the function to estimate the log-likelihood of the K-th
     # mixture.
@@ -161,8 +240,70 @@ def _approximate_sum_log_weights(target_K):
     return -target_K * np.log(target_K)
 
 
+def _log_determinants(covariance_matrices):
+    r"""
+    Return the logarithm of the determinant of each (full) covariance matrix,
+    computed from its Cholesky decomposition.
+
+    :param covariance_matrices:
+        An array of covariance matrices.
+
+    :returns:
+        An array containing :math:`\log{|\bm{C}_k|}` for each matrix.
+    """
+
+    cholesky = np.linalg.cholesky(covariance_matrices)
+    return 2 * np.sum(np.log(np.diagonal(cholesky, axis1=-2, axis2=-1)), axis=-1)
+
+
+def _score_splits(cov, responsibility, covariance_type, log_det_cov=None):
+    r"""
+    Score how much the message length could be shortened by splitting each
+    component, without running expectation-maximization.
+
+    The part of the message that encodes the data of the :math:`k`-th
+    component grows as :math:`\frac{1}{2}n_k\log{|\bm{C}_k|}`, which is
+    what a split can reduce, so components that are both large and broad are
+    scored highest. The log-determinants are taken relative to their mean,
+    so that the scores (like differences in message length) do not depend
+    on the units of the data.
+
+    :param cov:
+        The current estimates of the Gaussian covariance matrices.
+
+    :param responsibility:
+        The responsibility matrix for all :math:`N` observations being
+        partially assigned to each :math:`K` component.
+
+    :param covariance_type:
+        The structure of the covariance matrix for individual components.
+        The available options are: `full` for a free covariance matrix, or
+        `diag` for a diagonal covariance matrix.
+
+    :param log_det_cov: [optional]
+        The logarithm of the determinants of the covariance matrices, if they
+        have already been calculated.
+
+    :returns:
+        An array with a score for each component.
+    """
+
+    if log_det_cov is None:
+        if covariance_type == "full":
+            log_det_cov = _log_determinants(cov)
+
+        elif covariance_type == "diag":
+            log_det_cov = np.sum(np.log(cov), axis=1)
+
+        else:
+            raise ValueError("unknown covariance type")
+
+    effective_membership = np.sum(responsibility, axis=1)
+    return 0.5 * effective_membership * (log_det_cov - np.mean(log_det_cov))
+
+
 def _approximate_bound_sum_log_determinate_covariances(target_K, 
-    covariance_matrices, covariance_type):
+    covariance_matrices, covariance_type, log_det_cov=None):
     r"""
     Return an approximate expectation of the function:
 
@@ -186,7 +327,8 @@ def _approximate_bound_sum_log_determinate_covariances(target_K,
         |\bm{C}_k| = \frac{k_{current}}{k_{target}}\max\left(|C_k|\right)
 
     :param K:
-        The target number of Gaussian mixtures.
+        The target number of Gaussian mixtures. This can be an array of
+        targets.
     
     :param covariance_matrices:
         The current estimate of the covariance matrices.
@@ -194,6 +336,10 @@ def _approximate_bound_sum_log_determinate_covariances(target_K,
     :param covariance_type:
         The type of structure assumed for the covariance matrix.
 
+    :param log_det_cov: [optional]
+        The logarithm of the determinants of the current covariance matrices,
+        if they have already been calculated.
+
     :returns:
         An estimated lower and upper bound on the sum of the logarithm of the
         determinants of a :math:`K` Gaussian mixture.
@@ -202,46 +348,66 @@ def _approximate_bound_sum_log_determinate_covariances(target_K,
     # Get the current determinants.
     current_K, D, _ = covariance_matrices.shape
     assert covariance_type == "full" #TODO
-    assert target_K > current_K
+    assert np.all(target_K > current_K)
 
-    current_det = np.linalg.det(covariance_matrices)
+    if log_det_cov is None:
+        log_det_cov = _log_determinants(covariance_matrices)
 
-    current_det_bounds = np.array([np.min(current_det), np.max(current_det)])
-    target_det_bounds = current_K/float(target_K) * current_det_bounds
+    target_K = np.asarray(target_K, dtype=float)[..., np.newaxis]
+    current_log_det_bounds = np.array([np.min(log_det_cov), np.max(log_det_cov)])
+    target_log_det_bounds = np.log(current_K/target_K) + current_log_det_bounds
 
-    return target_K * np.log(target_det_bounds)
+    return target_K * target_log_det_bounds
 
 
 def _approximate_message_length_change(target_K, current_weights,
     current_cov, current_log_likelihood, N, initial_ll, normalization_factor, optimized_mixture_lls,
-    current_ml=0):
+    current_ml=0, log_det_cov=None, generating_function=None):
     r"""
     Estimate the change in message length between the current mixture of 
     Gaussians, and a target mixture.
+
+    The logarithm of the determinants of the current covariance matrices can
+    be given as ``log_det_cov``, and the function that approximates the log
+    likelihood of a target mixture (from 
+    :func:`_generator_for_approximate_log_likelihood_improvement`) can be given
+    as ``generating_function``, if they have already been calculated. Neither
+    depends on ``target_K``, which can be an array of targets to evaluate
+    them all at once.
     """
 
-    func = _generator_for_approximate_log_likelihood_improvement(1, initial_ll,
-        normalization_factor, *np.hstack([optimized_mixture_lls, current_log_likelihood]))
+    func = generating_function
+    if func is None:
+        func = _generator_for_approximate_log_likelihood_improvement(1, 
+            initial_ll, normalization_factor, 
+            *np.hstack([optimized_mixture_lls, current_log_likelihood]))
 
     current_K, D, _ = current_cov.shape
+    target_K = np.asarray(target_K)
     delta_K = target_K - current_K
-    assert delta_K > 0
+    assert np.all(delta_K > 0)
 
-    # Calculate everything except the log likelihood.
-    delta_I = delta_K * (
+    if log_det_cov is None:
+        log_det_cov = _log_determinants(current_cov)
+
+    # Calculate everything except the log likelihood. The terms that depend on
+    # target_K are made to broadcast against the (lower, upper) bounds.
+    t = target_K[..., np.newaxis]
+    delta_I = (t - current_K) * (
             (1 - D/2.0) * np.log(2) \
             + 0.25 * (D * (D+3) + 2) * np.log(N/(2*np.pi))) \
-        + 0.5 * (D*(D+3)/2 - 1) * (_approximate_sum_log_weights(target_K) - np.sum(np.log(current_weights))) \
-        - np.sum([np.log(current_K + dk) for dk in range(delta_K)]) \
-        + 0.5 * np.log(_total_parameters(target_K, D)/float(_total_parameters(current_K, D))) \
+        + 0.5 * (D*(D+3)/2 - 1) * (_approximate_sum_log_weights(t) - np.sum(np.log(current_weights))) \
+        - (scipy.special.gammaln(t) - scipy.special.gammaln(current_K)) \
+        + 0.5 * np.log(_total_parameters(t, D)/float(_total_parameters(current_K, D))) \
         + (D + 2)/2.0 * (
-            _approximate_bound_sum_log_determinate_covariances(target_K, current_cov, "full") \
-            - np.sum(np.log(np.linalg.det(current_cov)))) \
-        - func(target_K) + current_log_likelihood
+            _approximate_bound_sum_log_determinate_covariances(target_K,
+                current_cov, "full", log_det_cov=log_det_cov) \
+            - np.sum(log_det_cov)) \
+        - func(t) + current_log_likelihood
     # Generate a function.
     print("PREDICTING TARGET {} FROM {}: {}".format(target_K, current_weights.size, delta_I))
-    if delta_K == 1:
-        assert np.all(delta_I + current_ml > 0)
+    if np.any(delta_K == 1):
+        assert np.all((delta_I + current_ml)[delta_K == 1] > 0)
 
     return delta_I
 
@@ -270,12 +436,19 @@ class GaussianMixture(object):
     :param max_em_iterations: [optional]
         The maximum number of iterations to run per expectation-maximization
         loop (default: ``10000``).
+
+    :param single_precision: [optional]
+        Evaluate the :math:`N\times{}K` log probabilities in the expectation
+        step in single precision (default: ``False``). This is faster for
+        large :math:`N`, but the total log likelihood is only accurate to
+        about one part in :math:`10^8`.
     """
 
     parameter_names = ("mean", "covariance", "weight")
 
     def __init__(self, covariance_type="full", covariance_regularization=0, 
-        threshold=1e-5, max_em_iterations=10000, **kwargs):
+        threshold=1e-5, max_em_iterations=10000, single_precision=False,
+        **kwargs):
 
         available = ("full", "diag", )
         covariance_type = covariance_type.strip().lower()
@@ -298,6 +471,7 @@ class GaussianMixture(object):
         self._max_em_iterations = max_em_iterations
         self._covariance_type = covariance_type
         self._covariance_regularization = covariance_regularization
+        self._single_precision = single_precision
         return None
 
 
@@ -336,7 +510,12 @@ class GaussianMixture(object):
             threshold=self._threshold,
             max_em_iterations=self._max_em_iterations,
             covariance_type=self._covariance_type,
-            covariance_regularization=self._covariance_regularization)
+            covariance_regularization=self._covariance_regularization,
+            single_precision=self._single_precision)
+
+        # Cast the data once, instead of in every expectation step.
+        if self._single_precision:
+            kwds.update(y_float32=np.asarray(y, dtype=np.float32))
 
         N, D = y.shape
 
@@ -351,9 +530,9 @@ class GaussianMixture(object):
 
         while True:
 
-            # Split components, in order of ones with highest |C|.
-            component_indices = np.argsort(np.linalg.det(cov))[::-1]
-            split_component_index = component_indices[0]
+            # Split the component with the highest |C|. Only that one is
+            # needed, so there is no need to sort all of them.
+            split_component_index = np.argmax(_log_determinants(cov))
 
         
             # Split this mixture.
@@ -406,14 +585,15 @@ class GaussianMixture(object):
         child_mean = mean - np.vstack([+V[0], -V[0]]) * S[0]**0.5
 
         # Responsibilities are initialized by allocating the data points to the 
-        # closest of the two means.
-        distance = np.vstack([
-            np.sum((y - child_mean[0])**2, axis=1),
-            np.sum((y - child_mean[1])**2, axis=1)
-        ])
+        # closest of the two means. Since |y - mu|^2 = |y|^2 - 2y.mu + |mu|^2
+        # and the |y|^2 term is common to both means, it is not needed for the
+        # argmin.
+        distance = np.sum(child_mean**2, axis=1) - 2 * np.dot(y, child_mean.T)
         
-        child_responsibility = np.zeros((2, N))
-        child_responsibility[np.argmin(distance, axis=0), np.arange(N)] = 1.0
+        # With two means, the assignment is a mask rather than an index scatter.
+        closer_to_second = distance[:, 1] < distance[:, 0]
+        child_responsibility = np.vstack([~closer_to_second, closer_to_second]) \
+                             .astype(float)
 
         # Calculate the child covariance matrices.
         child_cov = _estimate_covariance_matrix(y, child_responsibility, child_mean,
@@ -427,16 +607,26 @@ class GaussianMixture(object):
         raise a
 
 
-    def search(self, y, **kwargs):
+    def search(self, y, exhaustive=True, **kwargs):
         r"""
         Search for the number of components.
+
+        :param exhaustive: [optional]
+            Split every component (and run E-M) at each step, and keep the 
+            best split (default: ``True``). If ``False``, only the component
+            with the highest score from :func:`_score_splits` is split.
         """
 
         kwds = dict(
             threshold=self._threshold, 
             max_em_iterations=self._max_em_iterations,
             covariance_type=self.covariance_type, 
-            covariance_regularization=self._covariance_regularization)
+            covariance_regularization=self._covariance_regularization,
+            single_precision=self._single_precision)
+
+        # Cast the data once, instead of in every expectation step.
+        if self._single_precision:
+            kwds.update(y_float32=np.asarray(y, dtype=np.float32))
 
         # Initialize the mixture.
         mu, cov, weight = _initialize(y, **kwds)
@@ -444,7 +634,7 @@ class GaussianMixture(object):
                 
         # Evaluate the initial function.
         initial_ll = ll.sum()
-        normalization_factor = 1.0/_evaluate_gaussian(y, mu[0], cov[0]).sum()
+        normalization_factor = 1.0/_evaluate_gaussians(y, mu, cov).sum()
 
 
         N, D = y.shape
@@ -454,38 +644,53 @@ class GaussianMixture(object):
         # TODO: We don't even need to run E-M.
         optimized_mixture_lls = []
         actual_sum_log_weights = [np.sum(np.log(weight))]
-        actual_sum_log_det_cov = [np.sum(np.log(np.linalg.det(cov)))]
+        # The log determinants are only recalculated when the covariance
+        # matrices change.
+        log_det_cov = _log_determinants(cov)
+        actual_sum_log_det_cov = [np.sum(log_det_cov)]
         predicted_sum_log_det_cov = [_approximate_bound_sum_log_determinate_covariances(2,
-            cov, "full")]
+            cov, "full", log_det_cov=log_det_cov)]
         while True:
 
             K = weight.size
-            best_perturbations = defaultdict(lambda: [np.inf])
 
-            for k in range(K):
+            # Only the index and the state of the best split are kept.
+            b_k, bp = (None, None)
+
+            if exhaustive:
+                candidates = range(K)
+            else:
+                candidates = [np.argmax(_score_splits(cov, R,
+                    kwds["covariance_type"], log_det_cov=log_det_cov))]
+
+            for k in candidates:
                 if K > 1:
-                    print("k", k, np.log(np.linalg.det(cov[k])))
+                    print("k", k, log_det_cov[k])
 
                 perturbation = split_component(y, mu, cov, weight, R, k, **kwds)
     
-                if perturbation[-1] < best_perturbations["split"][-1]:
-                    best_perturbations["split"] = [k] + list(perturbation)
+                if bp is None or perturbation[-1] < bp[-1]:
+                    b_k, bp = (k, perturbation)
 
-            bop, bp = min(best_perturbations.items(), key=lambda x: x[1][-1])
-            b_k, b_mu, b_cov, b_weight, b_R, b_meta, b_ml = bp
+            b_mu, b_cov, b_weight, b_R, b_meta, b_ml = bp
 
             print("TOOK {}".format(b_k))
 
-            # Predict say, 5 steps ahead.
-            bar = []
-            for _ in range(2, 2+20):
-                delta = _approximate_message_length_change(K+_, b_weight, b_cov,
-                    b_meta["log_likelihood"].sum(), N, initial_ll, normalization_factor,
-                    optimized_mixture_lls, b_ml)
-                predicted = delta + b_ml
-                bar.append(predicted)
-
-            bar = np.array(bar)
+            b_log_det_cov = _log_determinants(b_cov)
+
+            # Predict say, 5 steps ahead. The log likelihood approximation is
+            # the same for every target, so it is only fitted once.
+            b_generating_function = \
+                _generator_for_approximate_log_likelihood_improvement(1,
+                    initial_ll, normalization_factor, *np.hstack([
+                        optimized_mixture_lls, b_meta["log_likelihood"].sum()]))
+
+            delta = _approximate_message_length_change(K + np.arange(2, 2+20),
+                b_weight, b_cov, b_meta["log_likelihood"].sum(), N, initial_ll,
+                normalization_factor, optimized_mixture_lls, b_ml,
+                log_det_cov=b_log_det_cov,
+                generating_function=b_generating_function)
+            bar = delta + b_ml
             idx = np.argmin(bar.T[1])
             print("PREDICTED WE MOVE TO {}: {} (FROM {})".format(range(2, 2+20)[idx] + K, bar[idx], b_ml))
 
@@ -493,12 +698,13 @@ class GaussianMixture(object):
             optimized_mixture_lls.append(b_meta["log_likelihood"].sum())
 
             actual_sum_log_weights.append(np.sum(np.log(b_weight)))
-            actual_sum_log_det_cov.append(np.sum(np.log(np.linalg.det(b_cov))))
+            actual_sum_log_det_cov.append(np.sum(b_log_det_cov))
             predicted_sum_log_det_cov.append(_approximate_bound_sum_log_determinate_covariances(K + 2,
-                b_cov, "full"))
+                b_cov, "full", log_det_cov=b_log_det_cov))
 
             if message_length > b_ml:
                 mu, cov, weight, R, meta = (b_mu, b_cov, b_weight, b_R, b_meta)
+                log_det_cov = b_log_det_cov
                 message_length = b_ml
                 ll = b_meta["log_likelihood"]
             else:
@@ -544,8 +750,7 @@ class GaussianMixture(object):
             best_perturbations = defaultdict(lambda: [np.inf])
             
 
-            foo = weight * np.vstack([
-                _evaluate_gaussian(y, mu[k], cov[k]) for k in range(K)]).T
+            foo = weight * _evaluate_gaussians(y, mu, cov)
 
 
             _, old_ll = responsibility_matrix(y, mu, cov, weight, full_output=True, **kwds)    
@@ -562,7 +767,7 @@ class GaussianMixture(object):
                     - 0.5 * (np.sum(np.log(p_weight)) - np.sum(np.log(weight))) \
                     - D * np.log(2)/2.0 + D * (D+3)/4.0 * (np.log(N) + np.sum(np.log(p_weight)) - np.sum(np.log(weight))) \
                     - (D + 2)/2.0 * (np.sum(np.log(np.linalg.det(p_cov))) - np.sum(np.log(np.linalg.det(cov)))) \
-                    + 0.25 * (2 * np.log(Q(K+1)/Q(K)) - (D * (D+3) +2) * np.log(2*np.pi))
+                    + 0.25 * (2 * np.log(Q(K+1)/Q(K)) - (D * (D+3) +2) * _LOG_2PI)
                     ))
 
                 print("Gamma", K, k, gamma)
@@ -579,7 +784,7 @@ class GaussianMixture(object):
                     - 0.5 * (np.sum(np.log(p_weight)) - np.sum(np.log(weight))) \
                     - D * np.log(2)/2.0 + D * (D+3)/4.0 * (np.log(N) + np.sum(np.log(p_weight)) - np.sum(np.log(weight))) \
                     - (D + 2)/2.0 * (np.sum(np.log(np.linalg.det(p_cov))) - np.sum(np.log(np.linalg.det(cov)))) \
-                    + 0.25 * (2 * np.log(Q(K+1)/Q(K)) - (D * (D+3) +2) * np.log(2*np.pi))
+                    + 0.25 * (2 * np.log(Q(K+1)/Q(K)) - (D * (D+3) +2) * _LOG_2PI)
                     ))
                 """
                 #print("MYGAMMA", K, k, gamma2)
@@ -621,7 +826,7 @@ class GaussianMixture(object):
         raise a
 
 
-    def fit(self, y, num_components=None, **kwargs):
+    def fit(self, y, num_components=None, exhaustive=True, **kwargs):
         r"""
         Minimize the message length of a mixture of Gaussians, 
         using our own search algorithm.
@@ -631,6 +836,11 @@ class GaussianMixture(object):
             where :math:`N` is the number of observations, and :math:`D` is
             the number of dimensions per observation.
 
+        :param exhaustive: [optional]
+            Split every component (and run E-M) at each step, and keep the 
+            best split (default: ``True``). If ``False``, only the component
+            with the highest score from :func:`_score_splits` is split.
+
         :returns:
             A tuple containing the optimized parameters ``(mu, cov, weight)``.
         """
@@ -639,7 +849,12 @@ class GaussianMixture(object):
             threshold=self._threshold, 
             max_em_iterations=self._max_em_iterations,
             covariance_type=self.covariance_type, 
-            covariance_regularization=self._covariance_regularization)
+            covariance_regularization=self._covariance_regularization,
+            single_precision=self._single_precision)
+
+        # Cast the data once, instead of in every expectation step.
+        if self._single_precision:
+            kwds.update(y_float32=np.asarray(y, dtype=np.float32))
 
         """
 
@@ -685,28 +900,33 @@ class GaussianMixture(object):
 
         mu, cov, weight = _initialize(y, **kwds)
         R, ll, message_length = _expectation(y, mu, cov, weight, **kwds)
-        ll_dl = [(ll.sum(), message_length)]
         meta = dict(log_likelihood=ll.sum(), message_length=message_length)
 
         while True:
 
             K = weight.size
             if K >= num_components: break
-            best_perturbations = defaultdict(lambda: [np.inf])
+
+            # Only the index and the state of the best split are kept.
+            b_m, bp = (None, None)
             
-            # Split all components.
-            for k in range(K):
+            # Split all components, or just the most promising one.
+            if exhaustive:
+                candidates = range(K)
+            else:
+                candidates = [np.argmax(_score_splits(cov, R,
+                    kwds["covariance_type"]))]
+
+            for k in candidates:
                 p = split_component(y, mu, cov, weight, R, k, **kwds)
 
                 # Keep best split component.
-                if p[-1] < best_perturbations["split"][-1]:
-                    best_perturbations["split"] = [k] + list(p)
+                if bp is None or p[-1] < bp[-1]:
+                    b_m, bp = (k, p)
 
+            b_mu, b_cov, b_weight, b_R, b_meta, b_ml = bp
 
-            bop, bp = min(best_perturbations.items(), key=lambda x: x[1][-1])
-            b_m, b_mu, b_cov, b_weight, b_R, b_meta, b_ml = bp
-
-            logger.debug("Best operation: {} {}".format(bop, b_ml))
+            logger.debug("Best operation: {} {}".format("split", b_ml))
 
             # Set the new state as the best perturbation.
             message_length = b_ml
@@ -778,7 +998,8 @@ class GaussianMixture(object):
 
 
 def responsibility_matrix(y, mu, cov, weight, covariance_type, 
-    full_output=False, **kwargs):
+    full_output=False, single_precision=False, precision_cholesky=None,
+    y_float32=None, **kwargs):
     r"""
     Return the responsibility matrix,
 
@@ -818,21 +1039,46 @@ def responsibility_matrix(y, mu, cov, weight, covariance_type,
         If ``True``, return the responsibility matrix, and the log likelihood,
         which is evaluated for free (default: ``False``).
 
+    :param single_precision: [optional]
+        Evaluate the log probabilities in single precision (default: 
+        ``False``). The Cholesky factors are still computed in double
+        precision, and the responsibility matrix and log likelihood are
+        returned in double precision.
+
+    :param precision_cholesky: [optional]
+        The Cholesky decomposition of the precision matrices, if they have
+        already been computed from ``cov``.
+
+    :param y_float32: [optional]
+        The data values in single precision, if they have already been cast.
+        This is only used if ``single_precision`` is ``True``.
+
     :returns:
         The responsibility matrix. If ``full_output=True``, then the
         log likelihood (per observation) will also be returned.
     """
 
-    precision_cholesky = _compute_precision_cholesky(cov, covariance_type)
-    weighted_log_prob = np.log(weight) + \
-        _estimate_log_gaussian_prob(y, mu, precision_cholesky, covariance_type)
-
-    log_likelihood = scipy.misc.logsumexp(weighted_log_prob, axis=1)
-    with np.errstate(under="ignore"):
-        log_responsibility = weighted_log_prob - log_likelihood[:, np.newaxis]
+    if precision_cholesky is None:
+        precision_cholesky = _compute_precision_cholesky(cov, covariance_type)
+    if single_precision:
+        y = np.asarray(y if y_float32 is None else y_float32, dtype=np.float32)
+        mu, precision_cholesky = [np.asarray(_, dtype=np.float32) \
+            for _ in (mu, precision_cholesky)]
 
+    # The (N, K) array is updated in place from here on, so that no further
+    # temporaries of that size are allocated.
+    weighted_log_prob = _estimate_log_gaussian_prob(
+        y, mu, precision_cholesky, covariance_type)
+    weighted_log_prob += np.log(weight).astype(weighted_log_prob.dtype)
 
-    responsibility = np.exp(log_responsibility).T
+    log_likelihood = scipy.special.logsumexp(weighted_log_prob, axis=1)
+    with np.errstate(under="ignore"):
+        weighted_log_prob -= log_likelihood[:, np.newaxis]
+        if single_precision:
+            responsibility = np.exp(weighted_log_prob, dtype=np.float64).T
+            log_likelihood = log_likelihood.astype(np.float64)
+        else:
+            responsibility = np.exp(weighted_log_prob, out=weighted_log_prob).T
     
     if kwargs.get("dofail", False):
         raise a
@@ -882,27 +1128,37 @@ def kullback_leibler_for_multivariate_normals(mu_a, cov_a, mu_b, cov_b):
         the distance in units of bits.
     """
 
+    k = mu_a.size
+    offset = mu_b - mu_a
+
+    if len(cov_a.shape) == 1 and len(cov_b.shape) == 1:
+        # Diagonal covariance matrices need no factorization at all.
+        return 0.5 * (np.sum(cov_a / cov_b) + np.sum(offset**2 / cov_b) - k \
+                      + np.sum(np.log(cov_b)) - np.sum(np.log(cov_a)))
+
     if len(cov_a.shape) == 1:
         cov_a = cov_a * np.eye(cov_a.size)
 
     if len(cov_b.shape) == 1:
         cov_b = cov_b * np.eye(cov_b.size)
 
-    U, S, V = np.linalg.svd(cov_a)
-    Ca_inv = np.dot(np.dot(V.T, np.linalg.inv(np.diag(S))), U.T)
+    # Both covariance matrices are symmetric positive definite, so a single
+    # Cholesky factorization of each gives us the solves and the determinants.
+    cholesky_a = np.linalg.cholesky(cov_a)
+    cholesky_b = np.linalg.cholesky(cov_b)
 
-    U, S, V = np.linalg.svd(cov_b)
-    Cb_inv = np.dot(np.dot(V.T, np.linalg.inv(np.diag(S))), U.T)
+    log_det_a = 2 * np.sum(np.log(np.diag(cholesky_a)))
+    log_det_b = 2 * np.sum(np.log(np.diag(cholesky_b)))
 
-    k = mu_a.size
+    z = scipy.linalg.solve_triangular(cholesky_b, offset, lower=True,
+        check_finite=False)
 
-    offset = mu_b - mu_a
-    return 0.5 * np.sum([
-          np.trace(np.dot(Ca_inv, cov_b)),
-        + np.dot(offset.T, np.dot(Cb_inv, offset)),
-        - k,
-        + np.log(np.linalg.det(cov_b)/np.linalg.det(cov_a))
-    ])
+    # Tr(C_b^{-1} C_a) is the squared Frobenius norm of L_b^{-1} L_a, which
+    # needs one triangular solve rather than the two in a Cholesky solve.
+    W = scipy.linalg.solve_triangular(cholesky_b, cholesky_a, lower=True,
+        check_finite=False)
+    trace = np.sum(W**2)
+    return 0.5 * (trace + np.dot(z, z) - k + log_det_b - log_det_a)
 
 
 def _parameters_per_mixture(D, covariance_type):
@@ -994,25 +1250,35 @@ def _expectation(y, mu, cov, weight, **kwargs):
         the  log likelihood, and the change in message length.
     """
 
+    # Factorize the covariance matrices once, and use the same factors for the
+    # responsibilities and the determinants in the message length.
+    precision_cholesky = _compute_precision_cholesky(
+        cov, kwargs["covariance_type"])
+    log_det_cov = -2 * _compute_log_det_cholesky(
+        precision_cholesky, kwargs["covariance_type"], y.shape[1])
+
     responsibility, log_likelihood = responsibility_matrix(
-        y, mu, cov, weight, full_output=True, **kwargs)
+        y, mu, cov, weight, full_output=True,
+        precision_cholesky=precision_cholesky, **kwargs)
 
     nll = -np.sum(log_likelihood)
 
-    I = _message_length(y, mu, cov, weight, responsibility, nll, **kwargs)
+    I = _message_length(y, mu, cov, weight, responsibility, nll,
+        log_det_cov=log_det_cov, **kwargs)
     
     return (responsibility, log_likelihood, I)
 
 
 def log_kappa(D):
 
-    cd = -0.5 * D * np.log(2 * np.pi) + 0.5 * np.log(D * np.pi)
+    cd = -0.5 * D * _LOG_2PI + 0.5 * np.log(D * np.pi)
     return -1 + 2 * cd/D
 
 
 
 def _message_length(y, mu, cov, weight, responsibility, nll,
-    covariance_type, eps=0.10, dofail=False, full_output=False, **kwargs):
+    covariance_type, eps=0.10, dofail=False, full_output=False,
+    log_det_cov=None, **kwargs):
 
     # THIS IS SO BAD
 
@@ -1057,22 +1323,21 @@ def _message_length(y, mu, cov, weight, responsibility, nll,
     log_F_m += -np.sum(log_det_cov)
     log_F_m += -(D * np.log(2) + (D + 1) * np.sum(log_det_cov))    
     """
-    if D == 1:
-        log_F_m = np.log(2) + (2 * np.log(N)) - 4 * np.log(cov.flatten()[0]**0.5)
-        raise UnsureError
+    if log_det_cov is None:
+        if D == 1:
+            # The determinant of a 1x1 matrix is just its only entry.
+            log_det_cov = np.log(cov.reshape(M))
+
+        elif covariance_type == "diag":
+            log_det_cov = np.sum(np.log(cov), axis=1)
 
-    else:
-        if covariance_type == "diag":
-            cov_ = np.array([_ * np.eye(D) for _ in cov])
         else:
             # full
-            cov_ = cov
+            log_det_cov = _log_determinants(cov)
 
-        log_det_cov = np.log(np.linalg.det(cov_))
-    
-        log_F_m = 0.5 * D * (D + 3) * np.log(np.sum(responsibility, axis=1)) 
-        log_F_m += -log_det_cov
-        log_F_m += -(D * np.log(2) + (D + 1) * log_det_cov)
+    log_F_m = 0.5 * D * (D + 3) * np.log(np.sum(responsibility, axis=1)) 
+    log_F_m += -log_det_cov
+    log_F_m += -(D * np.log(2) + (D + 1) * log_det_cov)
 
         
     # TODO: No prior on h(theta).. thus -\sum_{j=1}^{M}\log{h\left(\theta_j\right)} = 0
@@ -1080,9 +1345,6 @@ def _message_length(y, mu, cov, weight, responsibility, nll,
     # TODO: bother about including this? -N * D * np.log(eps)
     
 
-    N_cp = _parameters_per_mixture(D, covariance_type)
-    part2 = nll + N_cp/(2*np.log(2))
-
     AOM = 0.001 # MAGIC
     Il = nll - (D * N * np.log(AOM))
     Il = Il/np.log(2) # [bits]
@@ -1157,16 +1419,20 @@ def _compute_precision_cholesky(covariances, covariance_type):
     if covariance_type in "full":
         M, D, _ = covariances.shape
 
+        # For the small matrices found here, calling LAPACK directly is much
+        # cheaper than going through the checks in the high-level wrappers.
         cholesky_precision = np.empty((M, D, D))
         for m, covariance in enumerate(covariances):
-            try:
-                cholesky_cov = scipy.linalg.cholesky(covariance, lower=True) 
-            except scipy.linalg.LinAlgError:
+            cholesky_cov, info = scipy.linalg.lapack.dpotrf(
+                covariance, lower=True, clean=True)
+            if info != 0:
                 raise ValueError(singular_matrix_error)
 
+            inverse, info = scipy.linalg.lapack.dtrtri(cholesky_cov, lower=True)
+            if info != 0:
+                raise ValueError(singular_matrix_error)
 
-            cholesky_precision[m] = scipy.linalg.solve_triangular(
-                cholesky_cov, np.eye(D), lower=True).T
+            cholesky_precision[m] = inverse.T
 
     elif covariance_type in "diag":
         if np.any(np.less_equal(covariances, 0.0)):
@@ -1182,28 +1448,33 @@ def _compute_precision_cholesky(covariances, covariance_type):
 
 
 def _estimate_covariance_matrix_full(y, responsibility, mean, 
-    covariance_regularization=0):
+    covariance_regularization=0, membership=None):
 
     N, D = y.shape
     M, N = responsibility.shape
 
-    membership = np.sum(responsibility, axis=1)
+    if D == 1:
+        return _estimate_covariance_matrix_diag(y, responsibility, mean,
+            covariance_regularization, membership).reshape((M, 1, 1))
 
-    I = np.eye(D)
-    cov = np.empty((M, D, D))
-    for m, (mu, rm, nm) in enumerate(zip(mean, responsibility, membership)):
+    if membership is None:
+        membership = np.sum(responsibility, axis=1)
+    denominator = np.where(membership > 1, membership - 1, membership)
 
+    cov = np.empty((M, D, D))
+    for m, (mu, rm) in enumerate(zip(mean, responsibility)):
         diff = y - mu
-        denominator = nm - 1 if nm > 1 else nm
+        cov[m] = np.dot(rm * diff.T, diff)
 
-        cov[m] = np.dot(rm * diff.T, diff) / denominator \
-               + covariance_regularization * I
+    cov /= denominator[:, np.newaxis, np.newaxis]
+    # Add the regularization to a strided view of the diagonals.
+    cov.reshape((M, -1))[:, ::D + 1] += covariance_regularization
 
     return cov
 
 
 def _estimate_covariance_matrix(y, responsibility, mean, covariance_type,
-    covariance_regularization):
+    covariance_regularization, membership=None):
 
     available = {
         "full": _estimate_covariance_matrix_full,
@@ -1216,27 +1487,25 @@ def _estimate_covariance_matrix(y, responsibility, mean, covariance_type,
     except KeyError:
         raise ValueError("unknown covariance type")
 
-    return function(y, responsibility, mean, covariance_regularization)
+    return function(y, responsibility, mean, covariance_regularization,
+        membership=membership)
 
 def _estimate_covariance_matrix_diag(y, responsibility, mean, 
-    covariance_regularization=0):
+    covariance_regularization=0, membership=None):
 
     N, D = y.shape
     M, N = responsibility.shape
 
-    denominator = np.sum(responsibility, axis=1)
-    denominator[denominator > 1] = denominator[denominator > 1] - 1
-
-    membership = np.sum(responsibility, axis=1)
+    if membership is None:
+        membership = np.sum(responsibility, axis=1)
+    denominator = np.where(membership > 1, membership - 1, membership)
 
-    I = np.eye(D)
     cov = np.empty((M, D))
-    for m, (mu, rm, nm) in enumerate(zip(mean, responsibility, membership)):
-
-        diff = y - mu
-        denominator = nm - 1 if nm > 1 else nm
+    for m, (mu, rm) in enumerate(zip(mean, responsibility)):
+        cov[m] = np.dot(rm, (y - mu)**2)
 
-        cov[m] = np.dot(rm, diff**2) / denominator + covariance_regularization
+    cov /= denominator[:, np.newaxis]
+    cov += covariance_regularization
 
     return cov
 
@@ -1282,21 +1551,33 @@ def _compute_log_det_cholesky(matrix_chol, covariance_type, n_features):
 def _estimate_log_gaussian_prob(X, means, precision_cholesky, covariance_type):
     n_samples, n_features = X.shape
     n_components, _ = means.shape
+    if covariance_type == "full" and n_features == 1:
+        # A 1x1 covariance matrix is also diagonal, and the diagonal branch
+        # needs no stacked matrix products.
+        precision_cholesky = precision_cholesky.reshape(n_components, 1)
+        covariance_type = "diag"
+
     # det(precision_chol) is half of det(precision)
     log_det = _compute_log_det_cholesky(
         precision_cholesky, covariance_type, n_features)
 
     if covariance_type in 'full':
-        log_prob = np.empty((n_samples, n_components))
-        for k, (mu, prec_chol) in enumerate(zip(means, precision_cholesky)):
-            y = np.dot(X, prec_chol) - np.dot(mu, prec_chol)
-            log_prob[:, k] = np.sum(np.square(y), axis=1)
+        # Whiten the data for all components at once: (n_components, n_samples,
+        # n_features) from a single stacked matrix product, and contract the
+        # squares without another temporary of that size.
+        y = np.matmul(X, precision_cholesky)
+        y -= np.matmul(means[:, np.newaxis, :], precision_cholesky)
+        log_prob = np.einsum("mnd,mnd->nm", y, y)
 
     elif covariance_type in 'diag':
         precisions = precision_cholesky**2
         log_prob = (np.sum((means ** 2 * precisions), 1) - 2.0 * np.dot(X, (means * precisions).T) + np.dot(X**2, precisions.T))
 
-    return -0.5 * (n_features * np.log(2 * np.pi) + log_prob) + log_det
+    # Finish in place, instead of allocating three more (N, K) arrays.
+    log_prob += n_features * _LOG_2PI
+    log_prob *= -0.5
+    log_prob += log_det
+    return log_prob
 
 
 def _maximization(y, mu, cov, weight, responsibility, parent_responsibility=1,
@@ -1339,17 +1620,19 @@ def _maximization(y, mu, cov, weight, responsibility, parent_responsibility=1,
     effective_membership = np.sum(responsibility, axis=1)
     new_weight = (effective_membership + 0.5)/(N + M/2.0)
 
-    w_responsibility = parent_responsibility * responsibility
-    w_effective_membership = np.sum(w_responsibility, axis=1)
+    if np.isscalar(parent_responsibility) and parent_responsibility == 1:
+        w_responsibility = responsibility
+        w_effective_membership = effective_membership
+
+    else:
+        w_responsibility = parent_responsibility * responsibility
+        w_effective_membership = np.sum(w_responsibility, axis=1)
 
-    new_mu = np.zeros_like(mu)
-    new_cov = np.zeros_like(cov)
-    for m in range(M):
-        new_mu[m] = np.sum(w_responsibility[m] * y.T, axis=1) \
-                  / w_effective_membership[m]
+    new_mu = np.dot(w_responsibility, y) / w_effective_membership[:, np.newaxis]
 
     new_cov = _estimate_covariance_matrix(y, responsibility, new_mu,
-        kwargs["covariance_type"], kwargs["covariance_regularization"])
+        kwargs["covariance_type"], kwargs["covariance_regularization"],
+        membership=effective_membership)
 
     state = (new_mu, new_cov, new_weight)
 
@@ -1525,14 +1808,14 @@ def split_component(y, mu, cov, weight, responsibility, index, **kwargs):
     assert np.all(np.isfinite(child_mu))
 
     # Responsibilities are initialized by allocating the data points to the 
-    # closest of the two means.
-    distance = np.vstack([
-        np.sum((y - child_mu[0])**2, axis=1),
-        np.sum((y - child_mu[1])**2, axis=1)
-    ])
+    # closest of the two means. Since |y - mu|^2 = |y|^2 - 2y.mu + |mu|^2 and
+    # the |y|^2 term is common to both means, it is not needed for the argmin.
+    distance = np.sum(child_mu**2, axis=1) - 2 * np.dot(y, child_mu.T)
     
-    child_responsibility = np.zeros((2, N))
-    child_responsibility[np.argmin(distance, axis=0), np.arange(N)] = 1.0
+    # With two means, the assignment is a mask rather than an index scatter.
+    closer_to_second = distance[:, 1] < distance[:, 0]
+    child_responsibility = np.vstack([~closer_to_second, closer_to_second]) \
+                         .astype(float)
 
     # Calculate the child covariance matrices.
     child_cov = _estimate_covariance_matrix(y, child_responsibility, child_mu,
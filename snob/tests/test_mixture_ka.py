@@ -0,0 +1,188 @@
+""" Test the Gaussian mixture model using the Kasarapu & Allison search. """
+
+import numpy as np
+import unittest
+
+from .. import mixture_ka as mixture
+
+
+class TestMaximization(unittest.TestCase):
+
+    def _maximization(self, y, covariance_type):
+        N, D = y.shape
+        mu = np.zeros((1, D))
+        cov = np.ones((1, D, D)) if covariance_type == "full" else np.ones((1, D))
+        weight = np.ones(1)
+        responsibility = np.ones((1, N))
+        return mixture._maximization(y, mu, cov, weight, responsibility,
+            covariance_type=covariance_type, covariance_regularization=0)
+
+
+    def test_full_covariance_with_large_offset(self):
+
+        np.random.seed(42)
+        for offset in (0, 1e4, 1e6, 1e7):
+            y = offset + np.random.multivariate_normal(
+                [0, 0], [[1, 0.3], [0.3, 2]], size=500)
+
+            mu, cov, weight = self._maximization(y, "full")
+            self.assertTrue(np.allclose(mu[0], np.mean(y, axis=0)))
+            self.assertTrue(np.allclose(cov[0], np.cov(y.T), rtol=1e-8))
+
+
+    def test_full_covariance_with_small_spread(self):
+
+        np.random.seed(42)
+        y = 3e3 + 1e-5 * np.random.randn(500, 2)
+
+        mu, cov, weight = self._maximization(y, "full")
+        self.assertTrue(np.all(np.diag(cov[0]) > 0))
+        self.assertTrue(np.allclose(cov[0], np.cov(y.T), rtol=1e-6, atol=0))
+
+
+    def test_diag_covariance_with_large_offset(self):
+
+        np.random.seed(42)
+        for offset in (0, 1e4, 1e6, 1e7):
+            y = offset + np.random.normal(0, [1, 2], size=(500, 2))
+
+            mu, cov, weight = self._maximization(y, "diag")
+            self.assertTrue(np.allclose(cov[0], np.var(y, axis=0, ddof=1),
+                rtol=1e-8))
+
+
+    def test_diag_covariance_with_small_spread(self):
+
+        np.random.seed(42)
+        y = 3e3 + 1e-5 * np.random.randn(500, 2)
+
+        mu, cov, weight = self._maximization(y, "diag")
+        self.assertTrue(np.all(cov[0] > 0))
+        self.assertTrue(np.allclose(cov[0], np.var(y, axis=0, ddof=1),
+            rtol=1e-6, atol=0))
+
+
+
+class TestOneDimensionalData(unittest.TestCase):
+
+    def test_fit(self):
+
+        np.random.seed(1)
+        y = np.hstack([
+            np.random.normal(0, 1, 300),
+            np.random.normal(6, 1, 300)
+        ]).reshape(-1, 1)
+
+        results = []
+        for covariance_type in ("full", "diag"):
+            model = mixture.GaussianMixture(covariance_type=covariance_type)
+            mu, cov, weight, meta = model.fit(y)
+
+            self.assertEqual(weight.size, 2)
+            self.assertTrue(np.allclose(np.sort(mu.flatten()), [0, 6],
+                atol=0.2))
+            results.append(meta["message_length"])
+
+        self.assertTrue(np.allclose(*results))
+
+
+
+class TestKullbackLeiblerDistance(unittest.TestCase):
+
+    def _reference(self, mu_a, cov_a, mu_b, cov_b):
+        # D_KL(a || b), evaluated with dense inverses and determinants.
+        inv_b = np.linalg.inv(cov_b)
+        offset = mu_b - mu_a
+        return 0.5 * (np.trace(np.dot(inv_b, cov_a)) \
+                      + np.dot(offset, np.dot(inv_b, offset)) - mu_a.size \
+                      + np.log(np.linalg.det(cov_b) / np.linalg.det(cov_a)))
+
+
+    def test_direction(self):
+
+        mu = np.array([[0.0, 0.0, 0.0], [1.0, -2.0, 0.5]])
+        cov = np.array([
+            [[1.0, 0.3, 0.0], [0.3, 2.0, 0.1], [0.0, 0.1, 0.5]],
+            [[4.0, -0.5, 0.2], [-0.5, 0.3, 0.0], [0.2, 0.0, 9.0]]
+        ])
+
+        a_to_b = mixture.kullback_leibler_for_multivariate_normals(
+            mu[0], cov[0], mu[1], cov[1])
+        b_to_a = mixture.kullback_leibler_for_multivariate_normals(
+            mu[1], cov[1], mu[0], cov[0])
+
+        self.assertAlmostEqual(a_to_b, self._reference(mu[0], cov[0], mu[1], cov[1]))
+        self.assertAlmostEqual(b_to_a, self._reference(mu[1], cov[1], mu[0], cov[0]))
+        self.assertGreater(abs(a_to_b - b_to_a), 0.1)
+
+        # The (a, b)-th entry of the pairwise distances is also from a to b.
+        for covariance_type, c in (("full", cov),
+            ("diag", np.diagonal(cov, axis1=1, axis2=2))):
+            precision_cholesky = mixture._compute_precision_cholesky(
+                c, covariance_type)
+            distances = mixture._kullback_leibler_distances(mu, c,
+                precision_cholesky, covariance_type)
+
+            if covariance_type == "diag":
+                c = np.array([np.diag(_) for _ in c])
+            self.assertAlmostEqual(distances[0, 1],
+                self._reference(mu[0], c[0], mu[1], c[1]))
+            self.assertAlmostEqual(distances[1, 0],
+                self._reference(mu[1], c[1], mu[0], c[0]))
+
+
+
+class TestParallelPerturbations(unittest.TestCase):
+
+    def test_same_as_serial(self):
+
+        np.random.seed(2)
+        y = np.vstack([
+            np.random.multivariate_normal(mean, np.eye(2), size=200) \
+                for mean in ([0, 0], [6, 0], [0, 6])])
+
+        model = mixture.GaussianMixture()
+        mu, cov, weight, meta = model.fit(y)
+
+        for kwds in (dict(processes=2), dict(processes=2, threads=True)):
+            p_mu, p_cov, p_weight, p_meta = model.fit(y, **kwds)
+
+            self.assertEqual(p_meta["message_length"], meta["message_length"])
+            self.assertTrue(np.all(p_mu == mu))
+            self.assertTrue(np.all(p_weight == weight))
+
+
+
+class TestMergeComponent(unittest.TestCase):
+
+    def test_distances_are_optional(self):
+
+        np.random.seed(3)
+        y = np.vstack([
+            np.random.multivariate_normal(mean, np.eye(2), size=200) \
+                for mean in ([0, 0], [3, 0], [0, 8])])
+
+        for covariance_type in ("full", "diag"):
+            kwds = dict(covariance_type=covariance_type,
+                covariance_regularization=0, threshold=1e-5,
+                max_em_iterations=10000)
+            mu, cov, weight = mixture._initialize(y, **kwds)
+            for m in range(2):
+                mu, cov, weight, R, meta, ml = mixture.split_component(
+                    y, mu, cov, weight, 
+                    mixture.responsibility_matrix(y, mu, cov, weight, **kwds),
+                    np.argmax(weight), **kwds)
+
+            precision_cholesky = mixture._compute_precision_cholesky(
+                cov, covariance_type)
+            distances = mixture._kullback_leibler_distances(mu, cov,
+                precision_cholesky, covariance_type)
+
+            for index in range(weight.size):
+                expected = mixture.merge_component(y, mu, cov, weight, R,
+                    index, distances=distances[index], **kwds)
+                actual = mixture.merge_component(y, mu, cov, weight, R,
+                    index, **kwds)
+
+                self.assertEqual(actual[-1], expected[-1])
+                self.assertTrue(np.all(actual[0] == expected[0]))
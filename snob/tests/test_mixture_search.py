@@ -0,0 +1,136 @@
+""" Test the Gaussian mixture model search. """
+
+import numpy as np
+import unittest
+
+from .. import mixture_search as mixture
+
+
+class TestScoreSplits(unittest.TestCase):
+
+    def test_scores_do_not_depend_on_units(self):
+
+        # One large, tight component and one small, broad component.
+        D = 2
+        cov = np.array([0.1 * np.eye(D), 4 * np.eye(D)])
+        responsibility = np.zeros((2, 1050))
+        responsibility[0, :1000] = 1
+        responsibility[1, 1000:] = 1
+
+        expected = mixture._score_splits(cov, responsibility, "full")
+
+        for scale in (1e-3, 1, 1e3):
+            for covariance_type, c in (("full", cov),
+                ("diag", np.diagonal(cov, axis1=1, axis2=2))):
+                scores = mixture._score_splits(scale**2 * c, responsibility,
+                    covariance_type)
+
+                self.assertTrue(np.allclose(scores, expected))
+                self.assertEqual(np.argmax(scores), 1)
+
+
+
+class TestOneDimensionalData(unittest.TestCase):
+
+    def test_fit(self):
+
+        np.random.seed(1)
+        y = np.hstack([
+            np.random.normal(0, 1, 300),
+            np.random.normal(6, 1, 300)
+        ]).reshape(-1, 1)
+
+        results = []
+        for covariance_type in ("full", "diag"):
+            model = mixture.GaussianMixture(covariance_type=covariance_type)
+            mu, cov, weight, meta = model.fit(y, num_components=2)
+
+            self.assertEqual(weight.size, 2)
+            self.assertTrue(np.allclose(np.sort(mu.flatten()), [0, 6],
+                atol=0.2))
+            results.append(meta["message_length"])
+
+        self.assertTrue(np.allclose(*results))
+
+
+
+class TestImprovementModels(unittest.TestCase):
+
+    def test_jacobian_shapes(self):
+
+        x = np.arange(1, 8, dtype=float)
+        for d in range(1, 7):
+            p = np.ones(d)
+            self.assertEqual(mixture._improvement_jacobian(d)(x, *p).shape,
+                (x.size, d))
+
+
+    def test_fit_with_many_parameters(self):
+
+        x = np.arange(1, 8, dtype=float)
+        y = 3.0 * np.exp(-0.5 * x) + 0.1
+
+        for d in (3, 5, 7):
+            p_opt = mixture._fit_improvement_model(x, y, d)
+            self.assertEqual(p_opt.size, d)
+            self.assertTrue(np.allclose(p_opt[:3], [3, 0.5, 0.1], rtol=1e-4))
+
+
+
+class TestKullbackLeiblerDistance(unittest.TestCase):
+
+    def _reference(self, mu_a, cov_a, mu_b, cov_b):
+        # D_KL(a || b), evaluated with dense inverses and determinants.
+        inv_b = np.linalg.inv(cov_b)
+        offset = mu_b - mu_a
+        return 0.5 * (np.trace(np.dot(inv_b, cov_a)) \
+                      + np.dot(offset, np.dot(inv_b, offset)) - mu_a.size \
+                      + np.log(np.linalg.det(cov_b) / np.linalg.det(cov_a)))
+
+
+    def test_direction(self):
+
+        mu_a, mu_b = (np.array([0.0, 0.0, 0.0]), np.array([1.0, -2.0, 0.5]))
+        cov_a = np.array([[1.0, 0.3, 0.0], [0.3, 2.0, 0.1], [0.0, 0.1, 0.5]])
+        cov_b = np.array([[4.0, -0.5, 0.2], [-0.5, 0.3, 0.0], [0.2, 0.0, 9.0]])
+
+        a_to_b = mixture.kullback_leibler_for_multivariate_normals(
+            mu_a, cov_a, mu_b, cov_b)
+        b_to_a = mixture.kullback_leibler_for_multivariate_normals(
+            mu_b, cov_b, mu_a, cov_a)
+
+        self.assertAlmostEqual(a_to_b, self._reference(mu_a, cov_a, mu_b, cov_b))
+        self.assertAlmostEqual(b_to_a, self._reference(mu_b, cov_b, mu_a, cov_a))
+        self.assertGreater(abs(a_to_b - b_to_a), 0.1)
+
+        # Diagonal covariances take a separate path.
+        diag_a, diag_b = (np.diag(cov_a), np.diag(cov_b))
+        self.assertAlmostEqual(
+            mixture.kullback_leibler_for_multivariate_normals(
+                mu_a, diag_a, mu_b, diag_b),
+            self._reference(mu_a, np.diag(diag_a), mu_b, np.diag(diag_b)))
+
+
+
+class TestSinglePrecision(unittest.TestCase):
+
+    def test_fit(self):
+
+        np.random.seed(4)
+        y = np.vstack([
+            np.random.multivariate_normal(mean, np.eye(3), size=500) \
+                for mean in ([0, 0, 0], [5, 0, 0], [0, 5, 5])])
+
+        for covariance_type in ("full", "diag"):
+            results = []
+            for single_precision in (False, True):
+                model = mixture.GaussianMixture(
+                    covariance_type=covariance_type,
+                    single_precision=single_precision)
+                mu, cov, weight, meta = model.fit(y, num_components=3)
+
+                self.assertEqual(mu.dtype, np.float64)
+                self.assertEqual(weight.size, 3)
+                results.append(meta["message_length"])
+
+            self.assertTrue(np.allclose(*results, rtol=1e-6, atol=0))